@@ -0,0 +1,242 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 在合成数据上运行 ja_wiki_p.py 与 p.py, 记录各阶段耗时与峰值内存, 并与golden输出对比
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_stream_memory
+import bench_wiki_memory
+import fixtures
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+
+REPO_DIR = fixtures.REPO_DIR
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+DIGESTS_FILE = os.path.join(GOLDEN_DIR, "digests.json")
+
+# 需要与golden对比的输出文件
+OUTPUT_FILES = [
+    "jawiki.json", "template_names.json", "character.jsonl", "report.json", "maybe_ja_names.txt", "subject_vn_crosswalk.json",
+]
+
+# 各脚本通过run_report.py输出的阶段报告
+RUN_REPORTS = {
+    "ja_wiki_p.py": "run_report_ja_wiki.json",
+    "p.py": "run_report_p.json",
+}
+
+
+def canonicalize(value: object) -> object:
+    # 消除 list(set(...)) 等造成的顺序差异
+    if isinstance(value, dict):
+        return {key: canonicalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [canonicalize(item) for item in value]
+        if all(not isinstance(item, (dict, list)) for item in items):
+            return sorted(items, key=lambda item: (type(item).__name__, str(item)))
+        return items
+    return value
+
+
+def canonical_text(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return "".join(
+                json.dumps(canonicalize(json.loads(line)), ensure_ascii=False, sort_keys=True) + "\n" for line in f
+            )
+        return json.dumps(canonicalize(json.load(f)), ensure_ascii=False, sort_keys=True, indent=1) + "\n"
+
+
+def run_script(script: str, args: list[str], work_dir: str) -> dict:
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    log_path = os.path.join(work_dir, f"{script}.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.time()
+        process = subprocess.Popen(  # noqa: S603
+            [sys.executable, os.path.join(REPO_DIR, script), *args],
+            cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        _, status, rusage = os.wait4(process.pid, 0)
+        end = time.time()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        with open(log_path, encoding="utf-8") as f:
+            sys.stderr.write(f.read()[-4000:])
+        msg = f"{script}运行失败, 返回值{process.returncode}"
+        raise RuntimeError(msg)
+
+    stages = {}
+    report_path = os.path.join(work_dir, RUN_REPORTS.get(script, ""))
+    if script in RUN_REPORTS and os.path.exists(report_path):
+        with open(report_path, encoding="utf-8") as f:
+            stages = {stage["name"]: stage for stage in json.load(f)["stages"]}
+    return {
+        "wall_s": round(end - start, 3),
+        "cpu_s": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+        "stages": stages,
+    }
+
+
+def compare_golden(work_dir: str, scale: int, digests: dict, update: bool) -> dict:
+    result = {}
+    scale_digests = digests.setdefault(str(scale), {})
+    golden_dir = os.path.join(GOLDEN_DIR, f"scale-{scale}")
+    for file_name in OUTPUT_FILES:
+        text = canonical_text(os.path.join(work_dir, file_name))
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if update:
+            scale_digests[file_name] = digest
+            if scale == 1:
+                os.makedirs(golden_dir, exist_ok=True)
+                with open(os.path.join(golden_dir, file_name), "w", encoding="utf-8") as f:
+                    f.write(text)
+            result[file_name] = "updated"
+        elif file_name not in scale_digests:
+            result[file_name] = "no golden"
+        elif scale_digests[file_name] == digest:
+            result[file_name] = "ok"
+        else:
+            result[file_name] = "DIFF"
+            golden_path = os.path.join(golden_dir, file_name)
+            if os.path.exists(golden_path):
+                with open(golden_path, encoding="utf-8") as f:
+                    golden_lines = f.read().splitlines()
+                for n, (old, new) in enumerate(zip(golden_lines, text.splitlines(), strict=False)):
+                    if old != new:
+                        logging.error(f"{file_name}第{n + 1}行不同:\n  golden: {old[:300]}\n  当前:   {new[:300]}")
+                        break
+                else:
+                    logging.error(f"{file_name}行数不同: golden {len(golden_lines)}, 当前 {len(text.splitlines())}")
+    return result
+
+
+def bench_scale(  # noqa: PLR0913
+    scale: int, seed: int, digests: dict, update: bool, keep: str | None, wiki_args: list[str], p_args: list[str],
+    shards: int = 0,
+) -> dict:
+    work_dir = os.path.join(keep, f"scale-{scale}") if keep else tempfile.mkdtemp(prefix=f"characterdb-bench-{scale}-")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        start = time.perf_counter()
+        sizes = fixtures.generate(work_dir, scale, seed)
+        report = {"scale": scale, "sizes": sizes, "fixtures_s": round(time.perf_counter() - start, 3)}
+        logging.info(f"{scale}×: 已生成合成数据 {sizes}")
+
+        report["ja_wiki_p.py"] = run_script("ja_wiki_p.py", wiki_args, work_dir)
+        report["ja_wiki_p.py"]["pages_per_s"] = round(sizes["wiki_pages"] / report["ja_wiki_p.py"]["wall_s"], 1)
+        logging.info(f"{scale}×: ja_wiki_p.py {report['ja_wiki_p.py']['wall_s']}s, 峰值内存 {report['ja_wiki_p.py']['peak_rss_mb']}MB")
+
+        if "--incremental" in p_args:
+            # 先完整运行一次生成指纹, 再在输入不变的情况下测量增量构建
+            report["p.py.cold"] = run_script("p.py", p_args, work_dir)
+            logging.info(f"{scale}×: p.py 首次运行 {report['p.py.cold']['wall_s']}s")
+        if shards:
+            # 依次运行各分片再合并, p.py记录耗时最长的分片(多机运行时的耗时约为最慢的分片加上合并)
+            shard_reports = [run_script("p.py", [*p_args, "--shard", f"{i}/{shards}"], work_dir) for i in range(shards)]
+            report["merge_shards.py"] = run_script("merge_shards.py", [], work_dir)
+            report["p.py"] = max(shard_reports, key=lambda result: result["wall_s"])
+            logging.info(f"{scale}×: 合并{shards}个分片 {report['merge_shards.py']['wall_s']}s")
+        else:
+            report["p.py"] = run_script("p.py", p_args, work_dir)
+        logging.info(f"{scale}×: p.py {report['p.py']['wall_s']}s, 峰值内存 {report['p.py']['peak_rss_mb']}MB")
+
+        report["golden"] = compare_golden(work_dir, scale, digests, update)
+        logging.info(f"{scale}×: golden {report['golden']}")
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=str, default="1", help="逗号分隔的规模倍数, 如 1,10,100")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--update-golden", action="store_true", help="用本次输出覆盖golden")
+    parser.add_argument("--keep", type=str, default=None, help="保留合成数据与输出的目录")
+    parser.add_argument("--output", type=str, default=None, help="将结果另存为json")
+    parser.add_argument("--stream", action="store_true", help="以流式模式运行p.py")
+    parser.add_argument("--multistream", action="store_true", help="让ja_wiki_p.py并行处理multistream转储")
+    parser.add_argument("--incremental", action="store_true", help="运行两次p.py, 测量第二次的增量构建")
+    parser.add_argument("--shards", type=int, default=0, help="将p.py分为N个分片运行后合并")
+    parser.add_argument("--wiki-memory-pages", type=int, default=50000,
+                        help="检查维基百科提取的RSS不随页面数增长时合成转储的页面数量, 0表示不检查")
+    parser.add_argument("--wiki-memory-max-growth-mb", type=float, default=2.0, help="维基百科提取允许的RSS增长")
+    parser.add_argument("--stream-memory-scales", type=str, default="1,10",
+                        help="检查流式模式的RSS不随角色数量增长时使用的规模, 逗号分隔, 空字符串表示不检查")
+    parser.add_argument("--stream-memory-max-growth-mb", type=float, default=2.0,
+                        help="流式模式中最大规模比最小规模允许多出的主循环RSS增长")
+    args = parser.parse_args()
+    p_args = ["--stream"] if args.stream else []
+    if args.incremental:
+        p_args += ["--incremental", "incremental"]
+    wiki_args = ["--input", "jawiki-pages-articles.xml"]
+    if args.multistream:
+        wiki_args = ["--input", "jawiki-pages-articles-multistream.xml.bz2",
+                     "--index", "jawiki-pages-articles-multistream-index.txt.bz2"]
+
+    digests = {}
+    if os.path.exists(DIGESTS_FILE):
+        with open(DIGESTS_FILE, encoding="utf-8") as f:
+            digests = json.load(f)
+    if digests.get("seed", args.seed) != args.seed and not args.update_golden:
+        logging.warning(f"golden基于seed {digests['seed']}生成, 与当前seed不同")
+
+    reports = [
+        bench_scale(int(s), args.seed, digests, args.update_golden, args.keep, wiki_args, p_args, args.shards)
+        for s in args.scales.split(",")
+    ]
+
+    wiki_memory = None
+    if args.wiki_memory_pages:
+        wiki_memory = bench_wiki_memory.check(args.wiki_memory_pages, 1500, args.seed, args.wiki_memory_max_growth_mb)
+    stream_memory = None
+    if args.stream_memory_scales:
+        stream_memory = bench_stream_memory.check(
+            [int(s) for s in args.stream_memory_scales.split(",")], args.seed, bench_stream_memory.CHUNK_SIZE,
+            args.stream_memory_max_growth_mb,
+        )
+
+    if args.update_golden:
+        digests["seed"] = args.seed
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(DIGESTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(digests, f, ensure_ascii=False, indent=4, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=4)
+
+    failed = False
+    for report in reports:
+        status = set(report["golden"].values())
+        failed = failed or "DIFF" in status
+        print(f"\n{report['scale']}× {report['sizes']}  golden: {','.join(sorted(status))}")
+        print(f"  {'stage':<36}{'wall(s)':>10}{'cpu(s)':>10}{'peak RSS':>10}{'items/s':>12}")
+        for script in RUN_REPORTS:
+            result = report[script]
+            print(f"  {script:<36}{result['wall_s']:>10.2f}{result['cpu_s']:>10.2f}{result['peak_rss_mb']:>9.1f}M")
+            for name, stage in result["stages"].items():
+                print(f"    {name:<34}{stage['wall_s']:>10.2f}{stage['cpu_s']:>10.2f}{stage['peak_rss_mb']:>9.1f}M"
+                      f"{stage['items_per_s'] or '':>12}")
+    if wiki_memory:
+        failed = failed or not wiki_memory["ok"]
+        print(f"\nwiki memory: {'ok' if wiki_memory['ok'] else 'GROWTH'}  {wiki_memory['pages']} pages  "
+              f"{wiki_memory['pages_per_s']} pages/s  RSS {wiki_memory['baseline_mb']}MB -> {wiki_memory['peak_mb']}MB "
+              f"(+{wiki_memory['growth_mb']}MB, max +{wiki_memory['max_growth_mb']}MB)")
+    if stream_memory:
+        failed = failed or not stream_memory["ok"]
+        growths = ", ".join(f"{scale['scale']}× {scale['growth_mb']:+}MB" for scale in stream_memory["scales"])
+        print(f"stream memory: {'ok' if stream_memory['ok'] else 'GROWTH'}  chunk {stream_memory['chunk_size']}  "
+              f"main loop RSS {growths} ({stream_memory['growth_mb']:+}MB, max +{stream_memory['max_growth_mb']}MB)")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 测量name_search索引在不同规模下的构建时间与查询延迟
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from characterdb.name_search import NameSearchIndex  # noqa: E402
+
+KATAKANA = [chr(c) for c in range(0x30A1, 0x30F7)]
+SURNAME_KANJI = list("佐藤鈴木高橋田中伊渡辺山本中村小林加吉松井清水森池田橋阿部石川前藤原後岡長谷村近坂遠青木西野斎宮崎川")
+KANJI = [chr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+LATIN = list("abcdefghijklmnopqrstuvwxyz")
+
+
+def random_name(rng: random.Random) -> str:
+    match rng.randrange(3):
+        case 0:
+            return "".join(rng.choices(SURNAME_KANJI, k=2)) + "".join(rng.choices(KANJI, k=rng.randint(1, 2)))
+        case 1:
+            return "".join(rng.choices(KATAKANA, k=rng.randint(2, 5))) + "・" + "".join(rng.choices(KATAKANA, k=rng.randint(2, 5)))
+        case _:
+            return ("".join(rng.choices(LATIN, k=rng.randint(3, 8))).title() + " "
+                    + "".join(rng.choices(LATIN, k=rng.randint(3, 8))).title())
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    # 模拟空格、分隔符、全角/半角与平假名/片假名差异, 以及一处错字
+    name = name.replace("・", rng.choice(["", " ", "・"]))
+    name = "".join(chr(ord(c) - 0x60) if 0x30A1 <= ord(c) <= 0x30F6 and rng.random() < 0.5 else c for c in name)  # noqa: PLR2004
+    if rng.random() < 0.3:  # noqa: PLR2004
+        name = "".join(chr(ord(c) + 0xFEE0) if "!" <= c <= "~" else c for c in name)
+    if len(name) > 3 and rng.random() < 0.5:  # noqa: PLR2004
+        i = rng.randrange(len(name))
+        name = name[:i] + name[i + 1:]
+    return name
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+def bench(names: list[str], queries: int, k: int, min_score: float, rng: random.Random) -> dict:
+    start = time.perf_counter()
+    index = NameSearchIndex()
+    for row, name in enumerate(names):
+        index.add(name, row, "ja")
+    build = time.perf_counter() - start
+
+    latencies = []
+    for name in rng.sample(names, min(queries, len(names))):
+        query = perturb(name, rng)
+        start = time.perf_counter()
+        index.search(query, k, min_score)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "names": len(names),
+        "keys": len(index),
+        "build_s": build,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=str, default="10000,100000,1000000", help="逗号分隔的索引规模")
+    parser.add_argument("--data", type=str, default=None, help="使用character.jsonl中的真实名称代替合成名称")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--min-score", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="将结果另存为json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool: list[str] = []
+    if args.data:
+        with open(args.data, encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                for field in ("zh", "ja", "en", "kana", "nick_name"):
+                    pool.extend(name for name in record.get(field) or [] if name)
+
+    reports = []
+    print(f"{'names':>10}{'keys':>10}{'build(s)':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        if pool:
+            names = [pool[i % len(pool)] for i in range(min(size, len(pool)))]
+        else:
+            names = [random_name(rng) for _ in range(size)]
+        report = bench(names, args.queries, args.k, args.min_score, rng)
+        reports.append(report)
+        print(f"{report['names']:>10}{report['keys']:>10}{report['build_s']:>10.2f}"
+              f"{report['p50_ms']:>10.3f}{report['p99_ms']:>10.3f}{report['mean_ms']:>10.3f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,132 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 检查流式模式(p.py --stream)处理角色时的内存占用不随角色数量增长: 在不同规模的合成数据上,
+# 加载完成后主循环中匿名RSS的增长之差超过阈值时返回非0
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import fixtures
+
+sys.path.insert(0, fixtures.REPO_DIR)
+
+from characterdb.builder import CharacterBuilder  # noqa: E402
+from characterdb.loader import iter_jsonl_by_id, load_data  # noqa: E402
+from characterdb.resources import s2t_converter, t2s_converter, tokenizer  # noqa: E402
+from characterdb.run_report import RunReport  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+
+SAMPLES = 40  # 每个规模在主循环中采样的次数
+# 块大小需要远小于1×规模的角色数量, 否则整个输入位于同一块中, 内存占用本就随角色数量增长
+CHUNK_SIZE = 50
+
+
+def anon_rss_mb() -> float | None:
+    # 匿名页的RSS; janome的词典通过mmap读取, 访问到的词典页面计入RSS但属于文件页, 上限为词典大小, 不计入
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def measure(chunk_size: int, characters: int) -> dict:
+    # 在当前目录中按流式模式加载数据并处理全部角色, 与 build.main 的流式分支相同, 但在主循环中采样RSS
+    s2t_converter()
+    t2s_converter()
+    tokenizer()
+    data = load_data(RunReport("stream_memory", os.devnull), stream=True)
+    builder = CharacterBuilder(data)
+    loaded = anon_rss_mb()
+    samples = []
+    sample_every = max(1, characters // SAMPLES)
+    results = 0
+    contents = iter_jsonl_by_id("character.jsonlines")
+    with open("character.jsonl", "w", encoding="utf-8") as character_file:
+        for results, result in enumerate(builder.process_contents(contents, None, chunk_size), 1):
+            character_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            builder.maybe_ja_names.clear()
+            if results % sample_every == 0:
+                samples.append(anon_rss_mb())
+    return {"characters": results, "loaded_mb": loaded, "samples": samples}
+
+
+def measure_scale(scale: int, seed: int, chunk_size: int) -> dict:
+    # 每个规模在新的子进程中测量, 避免缓存与已分配的内存从上一个规模延续下来
+    work_dir = tempfile.mkdtemp(prefix=f"characterdb-stream-memory-{scale}-")
+    try:
+        sizes = fixtures.generate(work_dir, scale, seed)
+        env = dict(os.environ, PYTHONHASHSEED="0")
+        subprocess.run(  # noqa: S603
+            [sys.executable, os.path.join(fixtures.REPO_DIR, "ja_wiki_p.py"), "--input", "jawiki-pages-articles.xml"],
+            cwd=work_dir, env=env, check=True, capture_output=True,
+        )
+        process = subprocess.run(  # noqa: S603
+            [sys.executable, os.path.abspath(__file__), "--measure", "--chunk-size", str(chunk_size),
+             "--characters", str(sizes["characters"])],
+            cwd=work_dir, env=env, check=True, capture_output=True, text=True,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result = json.loads(process.stdout.splitlines()[-1])
+    samples = result["samples"]
+    if len(samples) < SAMPLES // 2 or None in samples or result["loaded_mb"] is None:
+        msg = f"{scale}×: 只采样到{len(samples)}次匿名RSS(需要/proc/self/status)"
+        raise ValueError(msg)
+    return {
+        "scale": scale,
+        "characters": result["characters"],
+        "loaded_mb": round(result["loaded_mb"], 1),
+        "peak_mb": round(max(samples), 1),
+        "growth_mb": round(max(samples) - result["loaded_mb"], 1),
+    }
+
+
+def check(scales: list[int], seed: int, chunk_size: int, max_growth_mb: float) -> dict:
+    # 返回结果中ok为False表示最大规模与最小规模的主循环RSS增长之差超过阈值
+    results = [measure_scale(scale, seed, chunk_size) for scale in scales]
+    growth = results[-1]["growth_mb"] - results[0]["growth_mb"]
+    return {
+        "chunk_size": chunk_size,
+        "scales": results,
+        "growth_mb": round(growth, 1),
+        "max_growth_mb": max_growth_mb,
+        "ok": growth <= max_growth_mb,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=str, default="1,10", help="逗号分隔的规模倍数, 从小到大")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="传给process_contents的块大小")
+    parser.add_argument("--max-growth-mb", type=float, default=2.0, help="允许最大规模比最小规模多出的RSS增长")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--characters", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.chunk_size, args.characters)))
+        sys.exit(0)
+    try:
+        result = check([int(s) for s in args.scales.split(",")], args.seed, args.chunk_size, args.max_growth_mb)
+    except ValueError as e:
+        logging.error(e)  # noqa: TRY400
+        sys.exit(1)
+    for scale in result["scales"]:
+        print(f"{scale['scale']}× {scale['characters']} characters  RSS after loading {scale['loaded_mb']}MB  "
+              f"peak {scale['peak_mb']}MB  growth {scale['growth_mb']}MB")
+    if not result["ok"]:
+        logging.error(f"主循环RSS增长随角色数量增加了{result['growth_mb']}MB, 超过{args.max_growth_mb}MB")
+        sys.exit(1)
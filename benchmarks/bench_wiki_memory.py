@@ -0,0 +1,111 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 检查维基百科提取在处理大型合成转储时内存占用保持不变: RSS的增长超过阈值时返回非0
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from characterdb.run_report import rss_mb  # noqa: E402
+from characterdb.wiki_extractor import RULES, WikiExtractor  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+
+MIN_SAMPLES = 10  # 基线取前10%的采样, 采样太少时无法区分初始化与增长
+
+KATAKANA = [chr(c) for c in range(0x30A1, 0x30F7)]
+KANJI = [chr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+
+
+def write_dump(path: str, pages: int, page_size: int, seed: int) -> None:
+    # 大部分页面没有登场人物章节, 每100个页面中有一个含登场人物的页面
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="ja">\n')
+        f.write("  <siteinfo>\n    <sitename>Wikipedia</sitename>\n  </siteinfo>\n")
+        for page_id in range(1, pages + 1):
+            title = "".join(rng.choices(KANJI, k=4))
+            body = "".join(rng.choices(KANJI, k=page_size // 3))
+            if page_id % 100 == 0:
+                name = "".join(rng.choices(KATAKANA, k=4))
+                body = f"'''{title}'''\n\n== 登場人物 ==\n; {name}\n: {body}。\n\n== 脚注 ==\n"
+            f.write(
+                f"  <page>\n    <title>{escape(title)}</title>\n    <ns>0</ns>\n    <id>{page_id}</id>\n"
+                f"    <revision>\n      <id>{page_id * 10}</id>\n"
+                f'      <text xml:space="preserve">{escape(body)}</text>\n    </revision>\n  </page>\n',
+            )
+        f.write("</mediawiki>\n")
+
+
+def measure(path: str, sample_every: int) -> tuple[int, list[float]]:
+    extractor = WikiExtractor(RULES["ja"], quiet=True)
+    samples = []
+    subjects = 0
+    for n, _ in enumerate(extractor.iter_pages(path), 1):
+        subjects += 1
+        if n % sample_every == 0:
+            samples.append(rss_mb())
+    return subjects, samples
+
+
+def check(pages: int, page_size: int, seed: int, max_growth_mb: float) -> dict:
+    # 返回结果中ok为False表示RSS增长超过阈值; 页面太少或无法读取RSS时抛出ValueError
+    if rss_mb() is None:
+        msg = "无法读取当前进程的RSS(需要/proc/self/statm)"
+        raise ValueError(msg)
+    with tempfile.TemporaryDirectory(prefix="characterdb-wiki-memory-") as work_dir:
+        dump_path = os.path.join(work_dir, "jawiki-pages-articles.xml")
+        write_dump(dump_path, pages, page_size, seed)
+        logging.info(f"已生成合成转储: {pages}个页面, {os.path.getsize(dump_path) / (1024 * 1024):.1f}MB")
+
+        start = time.perf_counter()
+        subjects, samples = measure(dump_path, max(1, pages // 100 // 20))
+        wall = time.perf_counter() - start
+    if len(samples) < MIN_SAMPLES:
+        msg = f"只采样到{len(samples)}次RSS, 至少需要{MIN_SAMPLES}次, 请增加页面数量(每100个页面采样一次)"
+        raise ValueError(msg)
+
+    # 以前10%的采样作为基线, 排除解析器与词典初始化的影响
+    baseline = max(samples[:max(1, len(samples) // 10)])
+    growth = max(samples) - baseline
+    return {
+        "pages": pages,
+        "subjects": subjects,
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(pages / wall),
+        "baseline_mb": round(baseline, 1),
+        "peak_mb": round(max(samples), 1),
+        "last_mb": round(samples[-1], 1),
+        "growth_mb": round(growth, 1),
+        "max_growth_mb": max_growth_mb,
+        "ok": growth <= max_growth_mb,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200000, help="合成转储的页面数量")
+    parser.add_argument("--page-size", type=int, default=1500, help="每个页面正文的大致字节数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-growth-mb", type=float, default=8.0, help="允许的RSS增长")
+    args = parser.parse_args()
+
+    try:
+        result = check(args.pages, args.page_size, args.seed, args.max_growth_mb)
+    except ValueError as e:
+        logging.error(e)  # noqa: TRY400
+        sys.exit(1)
+    print(f"pages {result['pages']}  subjects {result['subjects']}  {result['wall_s']:.2f}s  {result['pages_per_s']} pages/s")
+    print(f"RSS baseline {result['baseline_mb']}MB  peak {result['peak_mb']}MB  last {result['last_mb']}MB  "
+          f"growth {result['growth_mb']}MB")
+    if not result["ok"]:
+        logging.error(f"RSS增长{result['growth_mb']}MB, 超过{args.max_growth_mb}MB")
+        sys.exit(1)
@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 随机检查subject与vn的对应表: 对应表与逐对调用subject_name_compare的结果相同,
+# 且按对应表筛选候选角色后选出的VNDB角色与原来的模糊匹配循环相同, 不一致时返回非0
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from characterdb.crosswalk import build_subject_vn_crosswalk  # noqa: E402
+from characterdb.names import subject_name_compare  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+
+# 标题由少量词组成, 使前4个字符相同、规范化后相同的标题足够常见
+WORDS = ["魔法", "少女", "学園", "物語", "恋", "空", "星", "夏", "約束", "剣"]
+# 会被 normalize_subject_name 去掉或替换的部分
+NOISE = [" ", "　", "\t", "「", "」", "*", "＊", "(体験版)", "（仮）", "【R18】"]  # noqa: RUF001
+
+
+def random_title(rng: random.Random) -> str:
+    parts = rng.choices(WORDS, k=rng.randint(1, 4))
+    for _ in range(rng.randint(0, 2)):
+        parts.insert(rng.randint(0, len(parts)), rng.choice(NOISE))
+    return "".join(parts)
+
+
+def old_resolve(char_ids: list[str], chars: dict[str, dict], subjects: list[dict]) -> str | None:
+    # user-041之前 CharacterBuilder.process_content 中匹配到多个角色时的处理
+    subject_names = [subject["name"] for subject in subjects] + [subject["zh_name"] for subject in subjects]
+    for char_id in char_ids:
+        if any(title in subject_names for title in chars[char_id]["subjects"]):
+            return char_id
+    for char_id in char_ids:
+        for subject1 in chars[char_id]["subjects"]:
+            for subject2 in subject_names:
+                if subject_name_compare(subject1, subject2):
+                    return char_id
+    return None
+
+
+def new_resolve(
+    char_ids: list[str], chars: dict[str, dict], subjects: list[dict],
+    chars_vns: dict[str, list[str]], subject_vns: dict[int, list[str]],
+) -> str | None:
+    # 当前 CharacterBuilder.process_content 中匹配到多个角色时的处理
+    vn_ids = set()
+    for subject in subjects:
+        vn_ids.update(subject_vns.get(subject["id"], ()))
+    candidates = [char_id for char_id in char_ids if not vn_ids.isdisjoint(chars_vns.get(char_id, ()))]
+    subject_names = [subject["name"] for subject in subjects] + [subject["zh_name"] for subject in subjects]
+    for char_id in candidates:
+        if any(title in subject_names for title in chars[char_id]["subjects"]):
+            return char_id
+    return candidates[0] if candidates else None
+
+
+def check(seed: int, subject_count: int, vn_count: int, char_count: int, rounds: int) -> int:
+    rng = random.Random(seed)
+    vn_titles = {f"v{i}": [random_title(rng) for _ in range(rng.randint(1, 3))] for i in range(vn_count)}
+    subjects = [
+        {"id": i, "name": random_title(rng), "name_cn": rng.choice(["", random_title(rng)])} for i in range(subject_count)
+    ]
+    # 与 loader.add_char_subjects 相同: 角色的subjects为其所在vn的全部标题; 部分vn不在vn_titles中
+    chars_vns = {f"c{i}": rng.sample([*vn_titles, "v-missing"], k=rng.randint(0, 3)) for i in range(char_count)}
+    chars = {
+        char_id: {"subjects": [title for vn_id in vn_ids for title in vn_titles.get(vn_id, [])]}
+        for char_id, vn_ids in chars_vns.items()
+    }
+
+    mismatches = 0
+    subject_vns = build_subject_vn_crosswalk(subjects, vn_titles)
+    for subject in subjects:
+        expected = sorted(
+            vn_id for vn_id, titles in vn_titles.items()
+            if any(subject_name_compare(title, name) for title in titles for name in (subject["name"], subject["name_cn"]))
+        )
+        if subject_vns.get(subject["id"], []) != expected:
+            logging.error(f"seed {seed} subject {subject}: {subject_vns.get(subject['id'], [])} != {expected}")
+            mismatches += 1
+
+    for _ in range(rounds):
+        char_ids = rng.sample(list(chars), k=rng.randint(2, 5))
+        character_subjects = [
+            {"id": subject["id"], "name": subject["name"], "zh_name": subject["name_cn"]}
+            for subject in rng.sample(subjects, k=rng.randint(1, 3))
+        ]
+        old = old_resolve(char_ids, chars, character_subjects)
+        new = new_resolve(char_ids, chars, character_subjects, chars_vns, subject_vns)
+        if old != new:
+            logging.error(f"seed {seed} {char_ids} {character_subjects}: {old} != {new}")
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seeds", type=int, default=20)
+    parser.add_argument("--subjects", type=int, default=200)
+    parser.add_argument("--vns", type=int, default=150)
+    parser.add_argument("--chars", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=2000, help="每个seed中随机抽取的多角色匹配次数")
+    args = parser.parse_args()
+
+    mismatches = sum(check(seed, args.subjects, args.vns, args.chars, args.rounds) for seed in range(args.seeds))
+    logging.info(f"{args.seeds}个seed, 不一致: {mismatches}")
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,152 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 用本地的http.server提供surname_pages中的页面, 检查名字爬虫的重试、中断后继续与无效页面的处理, 失败时返回非0
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from characterdb.surnames import SurnameScraper  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "surname_pages")
+PAGES = 5
+ROWS = 4
+
+
+def page_surnames(path: str, page: int) -> list[str]:
+    # 不同地址返回不同的名字, 用于检查缓存不会在地址之间共用
+    prefix = "佐藤" if path == "/ranking" else "鈴木"
+    return [f"{prefix}{page}{i}" for i in range(ROWS)]
+
+
+def expected(path: str) -> list[str]:
+    return [surname for page in range(PAGES) for surname in page_surnames(path, page)]
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        with open(os.path.join(PAGES_DIR, "ranking.html"), encoding="utf-8") as f:
+            self.ranking = f.read()
+        with open(os.path.join(PAGES_DIR, "captcha.html"), encoding="utf-8") as f:
+            self.captcha = f.read()
+        self.lock = threading.Lock()
+        # (地址, 页码) -> 正常返回前依次返回的状态码, "captcha" 表示状态码200的验证码页面
+        self.faults: dict[tuple[str, int], list[int | str]] = {}
+        self.requests: Counter[tuple[str, int]] = Counter()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def reset(self, faults: dict[tuple[str, int], list[int | str]] | None = None) -> None:
+        with self.lock:
+            self.faults = {key: list(value) for key, value in (faults or {}).items()}
+            self.requests.clear()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+        page = int(parse_qs(url.query)["page"][0])
+        key = (url.path, page)
+        with self.server.lock:
+            self.server.requests[key] += 1
+            faults = self.server.faults.get(key)
+            fault = faults.pop(0) if faults else None
+
+        if isinstance(fault, int):
+            self.send(fault, "error")
+        elif fault == "captcha":
+            self.send(200, self.server.captcha)
+        else:
+            rows = "\n".join(
+                f'<tr class="odd"><td>{page * ROWS + i + 1}</td><td><a href="#">{surname}</a></td><td>1000</td></tr>'
+                for i, surname in enumerate(page_surnames(url.path, page))
+            )
+            self.send(200, self.server.ranking.replace("<!-- rows -->", rows))
+
+    def send(self, status: int, body: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+def scrape(server: StandInServer, path: str, cache_dir: str, retries: int) -> list[str] | None:
+    scraper = SurnameScraper(server.url(path), workers=2, rate=0, retries=retries, backoff=0.01, cache_dir=cache_dir)
+    try:
+        return scraper.run(PAGES)
+    except RuntimeError:
+        return None
+
+
+def check_all(server: StandInServer, work_dir: str) -> list[str]:
+    failures = []
+
+    def check(name: str, ok: bool) -> None:
+        logging.info(f"{name}: {'ok' if ok else 'FAIL'}")
+        if not ok:
+            failures.append(name)
+
+    # 429/5xx与验证码页面重试后成功, 验证码页面不会被缓存
+    cache_dir = os.path.join(work_dir, "retry")
+    server.reset({("/ranking", 1): [429, 503], ("/ranking", 2): ["captcha"]})
+    check("429/5xx与无效页面重试", scrape(server, "/ranking", cache_dir, retries=3) == expected("/ranking"))
+    check("重试次数", server.requests[("/ranking", 1)] == 3 and server.requests[("/ranking", 2)] == 2)
+    server.reset()
+    check("缓存的页面有效", scrape(server, "/ranking", cache_dir, retries=0) == expected("/ranking")
+          and not server.requests)
+
+    # 重试用尽后失败, 重新运行时只获取失败的页面
+    cache_dir = os.path.join(work_dir, "resume")
+    server.reset({("/ranking", 3): [500, 502, 504]})
+    check("重试用尽后失败", scrape(server, "/ranking", cache_dir, retries=1) is None)
+    server.reset()
+    check("中断后继续", scrape(server, "/ranking", cache_dir, retries=1) == expected("/ranking"))
+    check("只重新获取失败的页面", dict(server.requests) == {("/ranking", 3): 1})
+
+    # 缓存中的无效页面被丢弃并重新获取
+    scraper = SurnameScraper(server.url("/ranking"), 1, 0, 0, 0, cache_dir)
+    with open(os.path.join(scraper.cache_dir, "0.html"), "w", encoding="utf-8") as f:
+        f.write(server.captcha)
+    server.reset()
+    check("无效的缓存", scrape(server, "/ranking", cache_dir, retries=0) == expected("/ranking"))
+    check("只重新获取无效的缓存", dict(server.requests) == {("/ranking", 0): 1})
+
+    # 同一缓存目录下, 不同地址的缓存互不影响
+    server.reset()
+    check("按地址区分缓存", scrape(server, "/other", cache_dir, retries=0) == expected("/other"))
+    check("其他地址全部重新获取", sum(server.requests.values()) == PAGES)
+    return failures
+
+
+if __name__ == "__main__":
+    server = StandInServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="characterdb-surnames-") as work_dir:
+            failures = check_all(server, work_dir)
+    finally:
+        server.shutdown()
+    if failures:
+        logging.error(f"{len(failures)}项检查失败: {', '.join(failures)}")
+        sys.exit(1)
@@ -0,0 +1,372 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 生成可缩放的合成数据集: jawiki XML(含multistream版本)、bangumi jsonlines 与 VNDB TSV
+from __future__ import annotations
+
+import bz2
+import json
+import os
+import random
+import shutil
+from xml.sax.saxutils import escape
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 1× 规模下各数据的数量
+BASE_SIZES = {
+    "subjects": 120,
+    "characters": 400,
+    "vns": 80,
+    "vndb_chars": 500,
+    "wiki_pages": 150,
+}
+
+HIRAGANA = [chr(c) for c in range(0x3042, 0x3094)]
+KATAKANA = [chr(c) for c in range(0x30A2, 0x30F4)]
+GIVEN_KANJI = list("花子太郎一二三美咲優真由香奈彩翔大輝陽菜結愛蓮悠斗葵凛")
+ZH_SURNAMES = list("王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高")
+ZH_GIVEN = list("伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚")
+TITLE_WORDS = ["魔法", "少女", "学園", "物語", "戦記", "恋", "空", "星", "夏", "約束", "剣", "夢", "桜", "月"]
+EN_WORDS = ["alice", "bob", "clara", "daniel", "eva", "frank", "grace", "henry", "iris", "jack"]
+
+JA_SENTENCES = [
+    "本作の主人公",
+    "{other}の妹",
+    "{other}の幼馴染",
+    "{other}の同級生",
+    "{other}の母親",
+    "生徒会長",
+    "明るく元気な性格",
+    "学園に通う少女",
+    "{other}のライバル",
+    "いつも本を読んでいる",
+    "謎めいた人物",
+]
+ZH_SENTENCES = [
+    "本作的女主角",
+    "男主角",
+    "{other}的妹妹",
+    "是{other}的青梅竹马的哥哥",
+    "性格开朗",
+    "高中生",
+    "喜欢看书",
+    "{other}的同班同学",
+]
+SUBJECT_TAGS = ["日本", "日本动画", "国产", "国产游戏", "漫画改", "原创", "GAL", "百合"]
+TRAIT_GROUPS = ["Hair", "Eyes", "Body", "Clothes", "Personality", "Role"]
+
+
+def _kana(rng: random.Random, table: list[str], low: int, high: int) -> str:
+    return "".join(rng.choices(table, k=rng.randint(low, high)))
+
+
+class Generator:
+    def __init__(self, scale: int, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.sizes = {key: value * scale for key, value in BASE_SIZES.items()}
+        with open(os.path.join(REPO_DIR, "jp_surnames.json"), encoding="utf-8") as f:
+            self.surnames: list[str] = json.load(f)[:300]
+        self.subjects: list[dict] = []
+        self.characters: list[dict] = []
+        self.character_subjects: dict[int, list[int]] = {}
+
+    def title(self) -> str:
+        rng = self.rng
+        match rng.randrange(3):
+            case 0:
+                return rng.choice(TITLE_WORDS) + "の" + rng.choice(TITLE_WORDS)
+            case 1:
+                return _kana(rng, KATAKANA, 3, 6) + rng.choice(TITLE_WORDS) + str(rng.randint(1, 99))
+            case _:
+                return rng.choice(TITLE_WORDS) + rng.choice(TITLE_WORDS) + "・" + _kana(rng, KATAKANA, 2, 5)
+
+    def character_names(self, zh_subject: bool) -> dict:
+        rng = self.rng
+        if zh_subject:
+            zh = rng.choice(ZH_SURNAMES) + "".join(rng.choices(ZH_GIVEN, k=rng.randint(1, 2)))
+            return {"name": zh, "zh": zh, "ja": None, "kana": None, "en": None}
+        surname = rng.choice(self.surnames)
+        given = "".join(rng.choices(GIVEN_KANJI, k=rng.randint(1, 2)))
+        kana = _kana(rng, HIRAGANA, 2, 4) + " " + _kana(rng, HIRAGANA, 2, 4)
+        match rng.randrange(4):
+            case 0:
+                name = f"{surname} {given}"
+            case 1:
+                name = _kana(rng, KATAKANA, 2, 4) + "・" + _kana(rng, KATAKANA, 3, 5)
+            case 2:
+                name = surname + given
+            case _:
+                name = rng.choice(EN_WORDS).title() + " " + rng.choice(EN_WORDS).title()
+        return {
+            "name": name,
+            "zh": (rng.choice(ZH_SURNAMES) + rng.choice(ZH_GIVEN)) if rng.random() < 0.5 else None,  # noqa: PLR2004
+            "ja": name if rng.random() < 0.5 else None,  # noqa: PLR2004
+            "kana": kana if rng.random() < 0.6 else None,  # noqa: PLR2004
+            "en": rng.choice(EN_WORDS).title() if rng.random() < 0.3 else None,  # noqa: PLR2004
+        }
+
+    def summary(self, zh: bool) -> str:
+        rng = self.rng
+        others = [c["name"] for c in self.characters[-20:]] or ["太郎"]
+        sentences = [s.format(other=rng.choice(others)) for s in rng.sample(ZH_SENTENCES if zh else JA_SENTENCES, 3)]
+        if zh:
+            return "，".join(sentences) + "。"
+        return "。".join(sentences) + "。"
+
+    # ---------------- bangumi ----------------
+    def bangumi(self, out_dir: str) -> None:
+        rng = self.rng
+        for subject_id in range(1, self.sizes["subjects"] + 1):
+            zh_subject = rng.random() < 0.15  # noqa: PLR2004
+            name = self.title()
+            tags = rng.sample(SUBJECT_TAGS[2:4] if zh_subject else SUBJECT_TAGS[:2], 1) + rng.sample(SUBJECT_TAGS[4:], 2)
+            self.subjects.append({
+                "id": subject_id,
+                "type": rng.choice([1, 2, 2, 4, 4, 4]),
+                "name": name if not zh_subject else rng.choice(ZH_SURNAMES) + "之" + rng.choice(ZH_GIVEN),
+                "name_cn": rng.choice(["", "魔法少女物语", "星之梦", name]),
+                "infobox": "",
+                "platform": 0,
+                "summary": "",
+                "nsfw": False,
+                "tags": [{"name": tag, "count": rng.randint(1, 100)} for tag in tags],
+                "zh": zh_subject,
+            })
+
+        subject_characters = []
+        for character_id in range(1, self.sizes["characters"] + 1):
+            subject = rng.choice(self.subjects)
+            names = self.character_names(subject["zh"])
+            fields = []
+            if names["zh"]:
+                fields.append(f"|简体中文名= {names['zh']}")
+            aliases = []
+            if names["zh"] and rng.random() < 0.2:  # noqa: PLR2004
+                aliases.append(f"[第二中文名|{names['zh']}酱]")
+            if names["ja"]:
+                aliases.append(f"[日文名|{names['ja']}]")
+            if names["kana"]:
+                aliases.append(f"[纯假名|{names['kana']}]")
+            if names["en"]:
+                aliases.append(f"[英文名|{names['en']}]")
+            if rng.random() < 0.3:  # noqa: PLR2004
+                aliases.append(f"[昵称|{names['name'][:2]}ちゃん／{names['name'][-1:]}たん]")
+            if aliases:
+                fields.append("|别名={\n" + "\n".join(aliases) + "\n}")
+            fields.append(f"|性别= {rng.choice(['男', '女'])}")
+            fields.append(f"|生日= {rng.randint(1, 12)}月{rng.randint(1, 28)}日")
+            infobox = "{{Infobox Crt\r\n" + "\r\n".join(fields) + "\r\n}}"
+            character = {
+                "id": character_id,
+                "role": 1,
+                "name": names["name"],
+                "infobox": infobox,
+                "summary": self.summary(subject["zh"]) if rng.random() < 0.85 else "",  # noqa: PLR2004
+                "comments": 0,
+                "collects": 0,
+            }
+            self.characters.append(character)
+            linked = {subject["id"]}
+            if rng.random() < 0.3:  # noqa: PLR2004
+                linked.add(rng.choice(self.subjects)["id"])
+            self.character_subjects[character_id] = sorted(linked)
+            for subject_id in sorted(linked):
+                subject_characters.append({
+                    "character_id": character_id,
+                    "subject_id": subject_id,
+                    "type": rng.choice([1, 2, 3]),
+                    "order": 0,
+                })
+
+        with open(os.path.join(out_dir, "character.jsonlines"), "w", encoding="utf-8") as f:
+            for character in self.characters:
+                f.write(json.dumps(character, ensure_ascii=False) + "\n")
+        with open(os.path.join(out_dir, "subject-characters.jsonlines"), "w", encoding="utf-8") as f:
+            for item in subject_characters:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        with open(os.path.join(out_dir, "subject.jsonlines"), "w", encoding="utf-8") as f:
+            for subject in self.subjects:
+                f.write(json.dumps({k: v for k, v in subject.items() if k != "zh"}, ensure_ascii=False) + "\n")
+
+    # ---------------- VNDB ----------------
+    def vndb(self, out_dir: str) -> None:
+        rng = self.rng
+        db_dir = os.path.join(out_dir, "vndb", "db")
+        os.makedirs(db_dir, exist_ok=True)
+        games = [s for s in self.subjects if s["type"] == 4] or self.subjects  # noqa: PLR2004
+
+        vn_rows, vn_ids = [], []
+        subject_vns: dict[int, list[str]] = {}
+        for n in range(1, self.sizes["vns"] + 1):
+            vid = f"v{n}"
+            vn_ids.append(vid)
+            subject = rng.choice(games)
+            match rng.randrange(3):
+                case 0:
+                    title = subject["name"]
+                    subject_vns.setdefault(subject["id"], []).append(vid)
+                case 1:
+                    # 前4个字相同的变体, 只能通过subject_name_compare匹配
+                    title = subject["name"] + "～" + rng.choice(TITLE_WORDS) + "～"
+                    subject_vns.setdefault(subject["id"], []).append(vid)
+                case _:
+                    title = self.title()
+            vn_rows.append(f"{vid}\tja\tt\t{title}\t\\N\n")
+            if rng.random() < 0.3:  # noqa: PLR2004
+                vn_rows.append(f"{vid}\ten\tf\t{rng.choice(EN_WORDS).title()} Story\t\\N\n")
+
+        traits_rows, parents_rows, leaf_traits = [], [], []
+        next_id = 1
+        for group in TRAIT_GROUPS:
+            gid = f"i{next_id}"
+            next_id += 1
+            traits_rows.append(f"{gid}\t\\N\t0\t0\tf\tt\tf\t{group}\t\t\\N\n")
+            for m in range(4):
+                tid = f"i{next_id}"
+                next_id += 1
+                traits_rows.append(f"{tid}\t{gid}\t{m}\t0\tf\tt\tt\t{group} {m}\t\t\\N\n")
+                parents_rows.append(f"{tid}\t{gid}\tt\n")
+                leaf_traits.append(tid)
+                for n in range(2):
+                    cid = f"i{next_id}"
+                    next_id += 1
+                    traits_rows.append(f"{cid}\t{gid}\t{n}\t0\tf\tt\tt\t{group} {m}-{n}\t\t\\N\n")
+                    parents_rows.append(f"{cid}\t{tid}\tt\n")
+                    leaf_traits.append(cid)
+
+        chars_rows, chars_vns_rows, chars_traits_rows = [], [], []
+        candidates = [c for c in self.characters if rng.random() < 0.7]  # noqa: PLR2004
+        for n in range(1, self.sizes["vndb_chars"] + 1):
+            cid = f"c{n}"
+            if candidates and rng.random() < 0.8:  # noqa: PLR2004
+                source = rng.choice(candidates)
+                name = source["name"]
+                if rng.random() < 0.3:  # noqa: PLR2004
+                    name = name.replace(" ", "")
+            else:
+                source = None
+                name = rng.choice(self.surnames) + "".join(rng.choices(GIVEN_KANJI, k=2))
+            latin = rng.choice(EN_WORDS).title() + " " + rng.choice(EN_WORDS).title() if rng.random() < 0.5 else "\\N"  # noqa: PLR2004
+
+            def num(low: int, high: int) -> str:
+                return str(rng.randint(low, high)) if rng.random() < 0.6 else "\\N"  # noqa: PLR2004, B023
+
+            columns = [
+                cid, "\\N", rng.choice(["f", "m", "unknown"]), "\\N",
+                rng.choice(["a", "b", "o", "ab", "\\N"]), rng.choice(["A", "B", "C", "D", "\\N"]), "\\N",
+                num(70, 100), num(50, 70), num(70, 100), num(1, 12), num(1, 28), num(140, 190), num(35, 80),
+                "0", num(10, 30), name, latin, "", "\\N",
+            ]
+            chars_rows.append("\t".join(columns) + "\n")
+            char_vns = set(rng.sample(vn_ids, rng.randint(1, 2)))
+            if source is not None and rng.random() < 0.6:  # noqa: PLR2004
+                # 让部分角色出现在与其bangumi作品同名的vn中
+                for subject_id in self.character_subjects[source["id"]]:
+                    char_vns.update(subject_vns.get(subject_id, [])[:1])
+            for vid in sorted(char_vns):
+                chars_vns_rows.append(f"{cid}\t{vid}\t\\N\tprimary\t0\n")
+            if rng.random() < 0.7:  # noqa: PLR2004
+                for tid in rng.sample(leaf_traits, rng.randint(1, 5)):
+                    chars_traits_rows.append(f"{cid}\t{tid}\t0\tf\n")
+
+        for file_name, rows in (
+            ("vn_titles", vn_rows),
+            ("traits", traits_rows),
+            ("traits_parents", parents_rows),
+            ("chars", chars_rows),
+            ("chars_vns", chars_vns_rows),
+            ("chars_traits", chars_traits_rows),
+        ):
+            with open(os.path.join(db_dir, file_name), "w", encoding="utf-8") as f:
+                f.writelines(rows)
+
+    # ---------------- jawiki ----------------
+    def wiki_entry(self, character: dict) -> str:
+        rng = self.rng
+        name = character["name"]
+        kana = _kana(rng, HIRAGANA, 3, 6)
+        match rng.randrange(3):
+            case 0:
+                key = f"{name}（{kana}）"
+            case 1:
+                key = f"[[{name}]]"
+            case _:
+                key = f"{{{{読み仮名|{name}|{kana}}}}}"
+        lines = [f"; {key}"]
+        lines.append(f": 声 - [[{rng.choice(self.surnames)}{rng.choice(GIVEN_KANJI)}]]")
+        for sentence in rng.sample(JA_SENTENCES, 2):
+            other = rng.choice(self.characters)["name"]
+            text = sentence.format(other=other)
+            if rng.random() < 0.3:  # noqa: PLR2004
+                text += "<ref>出典 {{Cite book|title=本}}</ref>"
+            if rng.random() < 0.2:  # noqa: PLR2004
+                text += "{{要出典範囲|とても強い|date=2020年1月}}"
+            lines.append(f": {text}。")
+        if rng.random() < 0.3:  # noqa: PLR2004
+            lines.append(f":* {{{{lang|en|{rng.choice(EN_WORDS).title()}}}}}と呼ばれる。")
+        return "\n".join(lines)
+
+    def wiki_page(self, page_id: int) -> tuple[str, str]:
+        rng = self.rng
+        subject = rng.choice(self.subjects)
+        chars = rng.sample(self.characters, min(len(self.characters), rng.randint(2, 6)))
+        entries = "\n".join(self.wiki_entry(c) for c in chars)
+        match rng.randrange(5):
+            case 0:
+                title = subject["name"] + "の登場人物"
+                text = f"『[[{subject['name']}]]』の登場人物一覧。\n\n== 主要人物 ==\n{entries}\n\n== 脚注 ==\n{{{{Reflist}}}}\n"
+            case 1 | 2:
+                title = subject["name"] if rng.random() < 0.7 else self.title()  # noqa: PLR2004
+                infobox = f"{{{{Infobox animanga/Header\n|タイトル = [[{subject['name']}]]\n}}}}\n"
+                text = (f"{infobox}'''{title}'''は日本の作品。\n\n== あらすじ ==\n物語。\n\n"
+                        f"== 登場人物 ==\n{entries}\n\n== 脚注 ==\n<references />\n\n== 外部リンク ==\n* 公式\n")
+            case 3:
+                title = subject["name"]
+                text = f"'''{title}'''\n\n=== 登場人物 ===\n{{{{Main|{title}の登場人物}}}}\n\n=== 用語 ===\nなし\n"
+            case _:
+                title = self.title() + "駅"
+                text = f"'''{title}'''は駅である。\n\n== 歴史 ==\n[[{page_id}年]]開業。\n"
+        return title, text
+
+    def jawiki(self, out_dir: str) -> None:
+        # 同时生成与普通转储内容相同的multistream转储及其索引, 每个bz2流100个页面
+        header = (
+            '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="ja">\n'
+            "  <siteinfo>\n    <sitename>Wikipedia</sitename>\n    <dbname>jawiki</dbname>\n  </siteinfo>\n"
+        )
+        pages = []
+        for n in range(self.sizes["wiki_pages"]):
+            page_id = 1000 + n * 7
+            title, text = self.wiki_page(page_id)
+            pages.append((page_id, title, (
+                f"  <page>\n    <title>{escape(title)}</title>\n    <ns>0</ns>\n    <id>{page_id}</id>\n"
+                f"    <revision>\n      <id>{page_id * 10 + 1}</id>\n      <timestamp>2024-01-01T00:00:00Z</timestamp>\n"
+                f'      <text bytes="{len(text.encode())}" xml:space="preserve">{escape(text)}</text>\n'
+                f"    </revision>\n  </page>\n"
+            )))
+        with open(os.path.join(out_dir, "jawiki-pages-articles.xml"), "w", encoding="utf-8") as f:
+            f.write(header)
+            f.writelines(page for _, _, page in pages)
+            f.write("</mediawiki>\n")
+
+        index_lines = []
+        with open(os.path.join(out_dir, "jawiki-pages-articles-multistream.xml.bz2"), "wb") as f:
+            f.write(bz2.compress(header.encode()))
+            for start in range(0, len(pages), 100):
+                offset = f.tell()
+                stream = pages[start:start + 100]
+                index_lines.extend(f"{offset}:{page_id}:{title}\n" for page_id, title, _ in stream)
+                f.write(bz2.compress("".join(page for _, _, page in stream).encode()))
+            f.write(bz2.compress(b"</mediawiki>\n"))
+        with bz2.open(os.path.join(out_dir, "jawiki-pages-articles-multistream-index.txt.bz2"), "wt", encoding="utf-8") as f:
+            f.writelines(index_lines)
+
+
+def generate(out_dir: str, scale: int = 1, seed: int = 0) -> dict:
+    os.makedirs(out_dir, exist_ok=True)
+    generator = Generator(scale, seed)
+    generator.bangumi(out_dir)
+    generator.vndb(out_dir)
+    generator.jawiki(out_dir)
+    shutil.copy(os.path.join(REPO_DIR, "jp_surnames.json"), os.path.join(out_dir, "jp_surnames.json"))
+    return generator.sizes
@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 对本地运行的server.py进行压测, 输出各接口的p50/p99延迟与吞吐量
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote
+
+
+def load_samples(path: str, limit: int) -> tuple[list[str], list[str], list[str]]:
+    names, ids, subjects = [], [], []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            ids.append(str(record["id"]))
+            for field in ("zh", "ja", "en", "kana", "nick_name"):
+                names.extend(name for name in record.get(field) or [] if name)
+            subjects.extend(str(subject["id"]) for subject in record.get("subjects") or [])
+            if len(ids) >= limit:
+                break
+    return names, ids, list(set(subjects))
+
+
+class Client:
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Length: {len(body)}\r\nContent-Type: application/json\r\n\r\n"
+            ).encode("latin-1") + body,
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.lower() == "content-length":
+                length = int(value)
+            elif key.lower() == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        await self.reader.readexactly(length)
+        if not keep_alive:
+            self.writer.close()
+            self.writer = None
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+async def worker(client: Client, plan: list[tuple[str, str, str, bytes]], deadline: float,
+                 latencies: dict[str, list[float]], errors: dict[str, int]) -> None:
+    while time.perf_counter() < deadline:
+        kind, method, path, body = random.choice(plan)  # noqa: S311
+        start = time.perf_counter()
+        try:
+            status = await client.request(method, path, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            client.close()
+            client.writer = None
+            errors[kind] = errors.get(kind, 0) + 1
+            continue
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if status >= 500:  # noqa: PLR2004
+            errors[kind] = errors.get(kind, 0) + 1
+
+
+async def run(args: argparse.Namespace) -> dict:
+    names, ids, subjects = load_samples(args.data, args.sample)
+    if not names or not ids:
+        msg = f"{args.data}中没有可用的样本"
+        raise ValueError(msg)
+    random.seed(args.seed)
+    plan = []
+    for _ in range(1000):
+        plan.append(("name", "GET", "/name/" + quote(random.choice(names)), b""))  # noqa: S311
+        plan.append(("id", "GET", "/id/" + quote(random.choice(ids)), b""))  # noqa: S311
+        if subjects:
+            plan.append(("subject", "GET", "/subject/" + quote(random.choice(subjects)), b""))  # noqa: S311
+    for _ in range(100):
+        batch = [random.choice(names) for _ in range(args.batch_size)]  # noqa: S311
+        plan.append(("batch", "POST", "/batch", json.dumps({"names": batch}, ensure_ascii=False).encode("utf-8")))
+
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    clients = [Client(args.host, args.port) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(worker(client, plan, deadline, latencies, errors) for client in clients))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+
+    report = {"duration": elapsed, "concurrency": args.concurrency, "endpoints": {}}
+    all_latencies = []
+    for kind, values in sorted(latencies.items()):
+        all_latencies.extend(values)
+        report["endpoints"][kind] = {
+            "requests": len(values),
+            "errors": errors.get(kind, 0),
+            "throughput": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    report["total"] = {
+        "requests": len(all_latencies),
+        "errors": sum(errors.values()),
+        "throughput": len(all_latencies) / elapsed,
+        "p50_ms": percentile(all_latencies, 50) * 1000,
+        "p99_ms": percentile(all_latencies, 99) * 1000,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=str, default="character.jsonl", help="用于抽取查询样本的character.jsonl")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长(秒)")
+    parser.add_argument("--batch-size", type=int, default=200, help="每个批量请求包含的名称数量")
+    parser.add_argument("--sample", type=int, default=100000, help="最多读取的角色数量")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="将结果另存为json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>12}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for kind, stats in [*report["endpoints"].items(), ("total", report["total"])]:
+        print(f"{kind:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput']:>12.1f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,3 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 模块只在导入时定义函数与常量, OpenCC、Janome与数据文件均在第一次使用时加载
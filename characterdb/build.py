@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import textwrap
+from typing import TYPE_CHECKING
+
+from tqdm import tqdm
+
+from characterdb.builder import CHUNK_SIZE, CharacterBuilder
+from characterdb.columnar import COLUMNAR_PATH, write_columnar
+from characterdb.incremental import IncrementalCache
+from characterdb.loader import iter_jsonl_by_id, load_data
+from characterdb.normalized import NORMALIZED_DIR, write_normalized
+from characterdb.resources import s2t_converter, t2s_converter, tokenizer
+from characterdb.run_report import RunReport
+from characterdb.shard import SHARD_DIR, iter_shard_contents, parse_shard, shard_path
+from characterdb.trait_index import TRAIT_INDEX_PATH, build_trait_index
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+def write_json_array(path: str, items: Iterable) -> None:
+    # 与 json.dump(list(items), file, ensure_ascii=False, indent=4) 输出相同, 但无需将所有元素保存在内存中
+    with open(path, "w", encoding="utf-8") as file:
+        first = True
+        for item in items:
+            file.write("[\n" if first else ",\n")
+            file.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=4), "    "))
+            first = False
+        file.write("[]" if first else "\n]")
+
+
+def iter_jsonl(path: str) -> Iterator:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def main(argv: list[str] | None = None) -> None:  # noqa: PLR0912, PLR0915
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true", help="逐个读取并立即写出角色, 内存占用只取决于索引大小")
+    parser.add_argument(
+        "--incremental", type=str, default=None, metavar="DIR",
+        help="保存上次的character.jsonl与各角色指纹的目录, 只重新处理输入有变化的角色",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=CHUNK_SIZE, metavar="N",
+        help="每批处理的角色数量; 流式模式下内存占用随之增长, 但不随角色总数增长",
+    )
+    parser.add_argument(
+        "--load-workers", type=int, default=None, metavar="N",
+        help="并行加载数据源的线程数(指定--load-processes时为进程数), 默认由concurrent.futures决定, 0表示在主线程中依次加载",
+    )
+    parser.add_argument(
+        "--load-processes", action="store_true",
+        help="在进程池而不是线程池中加载数据源; 结果需要pickle传回主进程, 加载期间峰值内存约为两倍",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None, metavar="i/N",
+        help="只处理按角色id划分的第i个分片(共N个), 结果写入--shard-dir, 全部完成后用merge_shards.py合并",
+    )
+    parser.add_argument("--shard-dir", type=str, default=SHARD_DIR, metavar="DIR", help="分片结果的输出目录")
+    parser.add_argument(
+        "--normalized", type=str, nargs="?", const=NORMALIZED_DIR, default=None, metavar="DIR",
+        help="另外输出规范化的结果(subject、标题与特征名放在单独的表中), 默认输出到normalized",
+    )
+    parser.add_argument(
+        "--columnar", type=str, nargs="?", const=COLUMNAR_PATH, default=None, metavar="PATH",
+        help="另外将VNDB数值字段导出为列式的.npz(需要numpy), 默认输出到character_numeric.npz",
+    )
+    parser.add_argument(
+        "--trait-index", type=str, nargs="?", const=TRAIT_INDEX_PATH, default=None, metavar="PATH",
+        help="另外输出VNDB特征的位图索引, 默认输出到trait_index.json",
+    )
+    parser.add_argument(
+        "--profile", type=str, nargs="?", const="profile", default=None, metavar="DIR",
+        help="用cProfile记录每个阶段, 并输出到该目录(默认profile)",
+    )
+    args = parser.parse_args(argv)
+    if args.incremental and os.path.abspath(args.incremental) == os.path.abspath("."):
+        parser.error("--incremental 目录不能是当前目录")
+    if args.incremental and args.shard:
+        parser.error("--incremental 不能与 --shard 同时使用")
+    if (args.normalized or args.columnar or args.trait_index) and args.shard:
+        parser.error("分片运行时请在merge_shards.py中指定 --normalized、--columnar 或 --trait-index")
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    load_workers = args.load_workers
+    if args.profile and load_workers != 0:
+        # cProfile只记录主线程, 为了让各加载阶段都有profile, 改为在主线程中依次加载
+        logging.info("指定了 --profile, 在主线程中依次加载数据源")
+        load_workers = 0
+
+    results = []
+    # 分片运行时只输出该分片的结果与统计, 由merge_shards.py合并
+    output_dir = shard_path(args.shard_dir, args.shard) if args.shard else "."
+    os.makedirs(output_dir, exist_ok=True)
+    run_report = RunReport("p", os.path.join(output_dir, "run_report_p.json"), profile_dir=args.profile)
+
+    with run_report.stage("init"):
+        s2t_converter()
+        t2s_converter()
+        tokenizer()
+
+    with run_report.stage("load_data"):
+        data = load_data(run_report, args.stream, load_workers, args.shard, args.load_processes)
+    builder = CharacterBuilder(data)
+
+    logging.info("开始生成结果")
+    cache = None
+    if args.incremental:
+        with run_report.stage("incremental.load") as stage:
+            cache = IncrementalCache(args.incremental, data)
+            stage.items_out = len(cache.index)
+    if args.shard:
+        # 每个角色与其产生的maybe_ja_names写在同一行
+        results_count = 0
+        with run_report.stage("main_loop") as stage, \
+                open(os.path.join(output_dir, "characters.jsonl"), "w", encoding="utf-8") as shard_file:
+            contents = iter_shard_contents(iter_jsonl_by_id("character.jsonlines"), args.shard)
+            for result in builder.process_contents(tqdm(contents), cache, args.chunk_size):
+                shard_file.write(json.dumps(
+                    {"result": result, "maybe_ja_names": builder.maybe_ja_names}, ensure_ascii=False,
+                ) + "\n")
+                results_count += 1
+                builder.maybe_ja_names.clear()
+            stage.items_in = stage.items_out = results_count
+            stage.counters.update(janome_tokenized=builder.janome_tokenized, janome_skipped=builder.janome_skipped)
+        content_total = results_count
+    elif args.stream:
+        # 流式模式: 每处理完一个角色立即写出结果(行缓冲), 中途崩溃时已写出的部分仍然可用
+        results_count = 0
+        with run_report.stage("main_loop") as stage, \
+                open("character.jsonl", "w", encoding="utf-8", buffering=1) as character_file, \
+                open("maybe_ja_names.jsonl.part", "w", encoding="utf-8", buffering=1) as maybe_ja_names_file:
+            for result in builder.process_contents(tqdm(iter_jsonl_by_id("character.jsonlines")), cache, args.chunk_size):
+                character_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results_count += 1
+                for maybe_ja_name in builder.maybe_ja_names:
+                    maybe_ja_names_file.write(json.dumps(maybe_ja_name, ensure_ascii=False) + "\n")
+                builder.maybe_ja_names.clear()
+            stage.items_in = stage.items_out = results_count
+            stage.counters.update(janome_tokenized=builder.janome_tokenized, janome_skipped=builder.janome_skipped)
+        content_total = results_count
+    else:
+        content_total = len(data.contents)
+        with run_report.stage("main_loop", content_total) as stage:
+            results.extend(builder.process_contents(tqdm(data.contents, total=content_total), cache, args.chunk_size))
+            stage.items_out = len(results)
+            stage.counters.update(janome_tokenized=builder.janome_tokenized, janome_skipped=builder.janome_skipped)
+        results_count = len(results)
+
+    logging.info(
+        f"总角色数量: {content_total}, 处理后的角色数量: {results_count}匹配到vndb信息的角色数量: {builder.info_match_count} ({builder.info_match_count / results_count * 100:.2f} %), 有tags的角色数量{builder.tags_match_count} ({builder.tags_match_count / results_count * 100:.2f} %),没有获取到中文名的角色数量: {builder.no_zh_count}, 没有获取到日文名或假名的角色数量{builder.no_ja_count}")
+
+    logging.info(f"Janome分词的日文句子数量: {builder.janome_tokenized}, 预筛选跳过的句子数量: {builder.janome_skipped}")
+    logging.info("保存结果")
+
+    with run_report.stage("serialize", results_count):
+        with open(os.path.join(output_dir, "report.json"), "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "content_total": results_count,
+                    "vndb_match_count": builder.info_match_count,
+                    "tags_match_count": builder.tags_match_count,
+                    "no_zh_count": builder.no_zh_count,
+                    "no_ja_count": builder.no_ja_count,
+                },
+                file,
+                ensure_ascii=False,
+                indent=4)
+
+        with open(os.path.join(output_dir, "subject_vn_crosswalk.json"), "w", encoding="utf-8") as file:
+            json.dump(data.subject_vns, file, ensure_ascii=False, indent=4)
+
+        if args.shard:
+            # 其余输出由merge_shards.py合并所有分片后生成
+            pass
+        elif args.stream:
+            # character.jsonl 已在处理过程中写出, 其余文件从中间文件逐条转换
+            write_json_array("maybe_ja_names.txt", iter_jsonl("maybe_ja_names.jsonl.part"))
+            os.remove("maybe_ja_names.jsonl.part")
+            write_json_array("character.json", iter_jsonl("character.jsonl"))
+        else:
+            with open("maybe_ja_names.txt", "w", encoding="utf-8") as file:
+                json.dump(builder.maybe_ja_names, file, ensure_ascii=False, indent=4)
+
+            with open("character.jsonl", "w", encoding="utf-8") as file:
+                for item in results:
+                    file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+            with open("character.json", "w", encoding="utf-8") as file:
+                json.dump(results, file, ensure_ascii=False, indent=4)
+
+    if args.normalized:
+        with run_report.stage("normalize") as stage:
+            stage.items_in = stage.items_out = write_normalized(iter_jsonl("character.jsonl"), args.normalized)
+
+    if args.columnar:
+        with run_report.stage("columnar") as stage:
+            stage.items_in = stage.items_out = write_columnar(iter_jsonl("character.jsonl"), args.columnar)
+
+    if args.trait_index:
+        with run_report.stage("trait_index") as stage:
+            stage.items_out = build_trait_index(iter_jsonl("character.jsonl"), args.trait_index)
+
+    if cache:
+        with run_report.stage("incremental.commit"):
+            cache.commit()
+
+    run_report.save()
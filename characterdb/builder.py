@@ -0,0 +1,777 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 由bangumi角色与VNDB/jawiki数据生成角色条目
+from __future__ import annotations
+
+import re
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from characterdb.names import (
+    clear,
+    get_jawiki_char_names,
+    include_japanese,
+    is_english_with_symbols,
+    is_japanese,
+    is_jp_name,
+    is_zh_name,
+    subject_name_compare,
+    text_includes_kana,
+)
+from characterdb.resources import s2t_converter, t2s_converter, tokenizer
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from janome.tokenizer import Token
+
+    from characterdb.incremental import IncrementalCache
+    from characterdb.loader import BuildData
+
+CHUNK_SIZE = 10000  # 每批处理的角色数量, 流式模式下同时决定OpenCC缓存的大小
+
+NAME_SPLIT_RE = re.compile(r"[／/、]")
+# info键 -> infobox中的键
+INFOBOX_FIELDS = {
+    "zh_name": "简体中文名",
+    "zh_name2": "第二中文名",
+    "ja_name": "日文名",
+    "ja_name2": "第二日文名",
+    "kana_name": "纯假名",
+    "kana_name2": "第二纯假名",
+    "en_name": "英文名",
+    "en_name2": "第二英文名",
+    "gender": "性别",
+    "nick_name": "昵称",
+    "nick_name2": "第二昵称",
+}
+# 以"|键= 值"形式出现的键, 其余为"[键|值]"形式
+INFOBOX_PIPE_FIELDS = ("简体中文名", "性别")
+# 两种形式都只消耗"[键"或"|键=", 值用零宽断言读取, 使相邻、嵌套的项与逐个键查找时一样都能被找到
+# "[键|值]": 值非空且不含"]"; "|键= 值": 值到下一个"|"或换行为止, 换行时下一行须以"|"开头
+INFOBOX_TOKEN_RE = re.compile(
+    r"\[({})(?=\|([^\]]+)\])|\|({})=(?=\s*([^\r\n|]*)\n?\|)".format(
+        "|".join(key for key in INFOBOX_FIELDS.values() if key not in INFOBOX_PIPE_FIELDS),
+        "|".join(INFOBOX_PIPE_FIELDS),
+    ),
+)
+
+
+def parse_infobox(infobox: str) -> dict[str, list[str]]:
+    # 一次扫描解析bangumi infobox中需要的键, 返回 键 -> 值列表(按出现顺序)
+    fields: dict[str, list[str]] = {}
+    for item_key, item_value, pipe_key, pipe_value in INFOBOX_TOKEN_RE.findall(infobox):
+        if item_key:
+            fields.setdefault(item_key, []).append(item_value)
+        else:
+            fields.setdefault(pipe_key, []).append(pipe_value)
+    return fields
+
+
+def get_infobox_info(content: dict) -> dict:
+    # 获取infobox内容
+    infobox: str = content["infobox"].replace("\r\n", "\n")
+    fields = parse_infobox(infobox)
+    info = {}
+    info["name"] = [content["name"]]
+    for key, infobox_key in INFOBOX_FIELDS.items():
+        info[key] = fields.get(infobox_key, [])
+    for key, item in info.items():
+        if not item or item[0] == "":
+            if key not in ["gender"]:
+                info[key] = []
+            else:
+                info[key] = ""
+            continue
+        cleared_item = clear(item[0])
+        if key not in ["gender"]:
+            cleared_item = NAME_SPLIT_RE.split(cleared_item)
+        info[key] = cleared_item
+    return info
+
+
+def get_opencc_candidates(info: dict) -> tuple[list[str], list[str]]:
+    # 返回 (需要繁体化的文本, 需要简体化的文本), 与 is_jp_name/is_zh_name 及中文名回退中的调用一致
+    s2t_texts = info["name"]
+    t2s_texts = [n.strip() for n in info["name"]]
+    t2s_texts += [n.replace(" ", "") for n in [*info["ja_name"], *info["ja_name2"], *info["name"]]]
+    return s2t_texts, t2s_texts
+
+
+# 按词条长度降序: dict(sorted(ja.items(), key=lambda x: len(x[0]), reverse=True))
+JA_TERMS = {
+    '目的のために使役される者': ('被利用者', True),
+    '姦計を企てる者': ('阴谋家', False),
+    '最後の生き残り': ('最后幸存者', False),
+    '組織のリーダー': ('组织领导者', False),
+    '仲直りした人物': ('和解者', False),
+    '罠に落ちた人物': ('陷阱受害者', False),
+    '腹違いの妹': ('同父异母的妹妹', True),
+    '腹違いの姉': ('同父异母的姐姐', True),
+    '腹違いの長兄': ('同父异母的长兄', True),
+    '腹違いの兄': ('同父异母的兄弟', True),
+    '腹違いの弟': ('同父异母的弟弟', True),
+    'バイオロイド': ('生化人', False),
+    '忘れられた者': ('被遗忘者', False),
+    'アンドロイド': ('人造人', False),
+    '遭遇する人物': ('遭遇者', False),
+    '謎めいた人物': ('神秘人物', False),
+    '騙された人物': ('被欺骗者', False),
+    '守るべき存在': ('值得守护者', False),
+    '悪行の犠牲者': ('罪恶受害者', False),
+    '虐待の被害者': ('虐待受害者', False),
+    '苦悩する人物': ('苦恼者', False),
+    '実験の被験者': ('实验对象', False),
+    '封印されし者': ('被封印者', False),
+    '翻弄される者': ('被玩弄者', False),
+    '謎めいた存在': ('神秘存在', False),
+    '義理の兄弟': ('继兄弟', True),
+    '義理の姉妹': ('继姐妹', True),
+    '義理の息子': ('继子', True),
+    '義理の祖父': ('继祖父', True),
+    '義理の祖母': ('继祖母', True),
+    '義理の叔父': ('继叔父', True),
+    '義理の叔母': ('继叔母', True),
+    '対立する者': ('对立者', False),
+    '偽りの仲間': ('虚假同伴', True),
+    '英雄の師匠': ('英雄导师', False),
+    '学問の師匠': ('学问导师', False),
+    '闇の支配者': ('暗黑支配者', False),
+    '悲劇の人物': ('悲剧人物', False),
+    '苦しむ人物': ('受苦者', False),
+    '使役する者': ('利用者', False),
+    '後悔する者': ('后悔者', False),
+    '謎めいた男': ('神秘男子', False),
+    '謎めいた女': ('神秘女子', False),
+    '魅了する者': ('魅惑者', False),
+    '愛憎の対象': ('爱憎对象', False),
+    '人生の指針': ('人生导师', True),
+    '生徒会長': ('学生会长', False),
+    '女性医師': ('女医生', False),
+    '女子大生': ('女大学生', False),
+    'ロボット': ('机器人', False),
+    '義理の父': ('继父', True),
+    '義理の母': ('继母', True),
+    '義理の娘': ('继女', True),
+    '義理の孫': ('继孙子/继孙女', True),
+    '義理の 姪': ('继侄女/继侄子', True),
+    '担任教師': ('班主任', False),
+    '競争相手': ('竞争对手', True),
+    'ライバル': ('对手', True),
+    '裏切り者': ('叛徒', False),
+    '結婚相手': ('配偶', False),
+    '不倫相手': ('外遇对象', False),
+    '影の存在': ('影子', False),
+    '秘密組織': ('秘密组织', False),
+    '裏の黒幕': ('幕后黑手', False),
+    '人造人間': ('人造人', False),
+    '心理学者': ('心理学家', False),
+    '人間兵器': ('人类武器', False),
+    '取り巻き': ('随从', False),
+    '消えた者': ('消失者', False),
+    '愛する者': ('爱人', True),
+    '教える者': ('教导者', False),
+    '主人公': ('主人公', False),
+    '転入生': ('转学生', False),
+    '老医師': ('老医生', False),
+    '指揮官': ('指挥官', True),
+    '警備員': ('警备员', True),
+    '保安官': ('警长', True),
+    '曽祖父': ('曾祖父', True),
+    '従姉妹': ('堂姐妹', True),
+    '従兄弟': ('堂兄弟', True),
+    '幼馴染': ('青梅竹马', True),
+    '同級生': ('同学', True),
+    '従業員': ('员工', False),
+    '捜査員': ('调查员', True),
+    '配偶者': ('配偶', True),
+    '嫌疑者': ('嫌疑人', False),
+    '被告人': ('被告人', False),
+    '守護者': ('守护者', False),
+    '犯罪者': ('罪犯', False),
+    '逃亡者': ('逃亡者', False),
+    '裁判官': ('审判官', False),
+    '追跡者': ('追踪者', False),
+    '謎の男': ('神秘男子', False),
+    '謎の女': ('神秘女子', False),
+    '実験体': ('实验体', False),
+    '生存者': ('幸存者', False),
+    'スパイ': ('间谍', False),
+    '諜報員': ('情报员', False),
+    '内通者': ('内鬼', False),
+    '依頼人': ('委托人', False),
+    '復讐者': ('复仇者', False),
+    '治癒者': ('治愈者', False),
+    '堕落者': ('堕落者', False),
+    '暗殺者': ('刺客', False),
+    '尋問者': ('审讯者', False),
+    '負傷者': ('受伤者', False),
+    '狂信者': ('狂热者', False),
+    '誘惑者': ('诱惑者', False),
+    '共闘者': ('共同作战者', False),
+    '再生者': ('再生者', False),
+    '破滅者': ('毁灭者', False),
+    '求愛者': ('求爱者', False),
+    '逃避者': ('逃避者', False),
+    '見習い': ('学徒', False),
+    '悩む者': ('苦恼者', False),
+    '掠奪者': ('掠夺者', False),
+    '支配者': ('支配者', False),
+    '壊す者': ('破坏者', False),
+    '母親': ('母亲', True),
+    '祖父': ('祖父', True),
+    '老人': ('老人', False),
+    '漁師': ('渔夫', False),
+    '盗賊': ('盗贼', False),
+    '女性': ('女性', False),
+    '医師': ('医生', False),
+    '警察': ('警察', False),
+    '恋人': ('恋人', True),
+    '戦友': ('战友', True),
+    '青年': ('青年', False),
+    '友人': ('友人', True),
+    '彼女': ('女友', True),
+    '魔物': ('魔物', False),
+    '魔王': ('魔王', False),
+    '神々': ('神', False),
+    '王子': ('王子', False),
+    '祖母': ('祖母', True),
+    '叔父': ('叔父', True),
+    '息子': ('儿子', True),
+    '叔母': ('叔母', True),
+    '伯母': ('伯母', True),
+    '継父': ('继父', True),
+    '義母': ('继母', True),
+    '継母': ('继母', True),
+    '生母': ('亲生母亲', True),
+    '実母': ('亲生母亲', True),
+    '養母': ('养母', True),
+    '乳母': ('保姆', True),
+    '従妹': ('堂姐妹', True),
+    '養子': ('养子', True),
+    '養女': ('养女', True),
+    '先生': ('老师', False),
+    '学生': ('学生', False),
+    '上司': ('上司', True),
+    '部下': ('部下', True),
+    '同僚': ('同事', True),
+    '友達': ('朋友', True),
+    '恩師': ('恩师', True),
+    '教師': ('老师', False),
+    '恩人': ('恩人', True),
+    '仲間': ('同伴', True),
+    '武将': ('武将', False),
+    '相棒': ('搭档', False),
+    '少年': ('少年', False),
+    '少女': ('少女', False),
+    '家族': ('家人', True),
+    '隣人': ('邻居', True),
+    '仮面': ('面具', False),
+    '忍者': ('忍者', False),
+    '商人': ('商人', False),
+    '王妃': ('王妃', False),
+    '巫女': ('巫女', False),
+    '司祭': ('祭司', False),
+    '賢者': ('贤者', False),
+    '使者': ('使者', False),
+    '隊長': ('队长', False),
+    '首相': ('首相', False),
+    '皇子': ('皇子', False),
+    '皇女': ('皇女', False),
+    '手下': ('手下', False),
+    '宿敵': ('宿敌', False),
+    '刺客': ('刺客', False),
+    '騎士': ('骑士', False),
+    '女王': ('女王', False),
+    '愛人': ('情人', True),
+    '許婚': ('未婚夫/未婚妻', True),
+    '仲人': ('媒人', False),
+    '捕虜': ('俘虏', False),
+    '悪党': ('恶棍', False),
+    '悪魔': ('恶魔', False),
+    '天使': ('天使', False),
+    '妖精': ('精灵', False),
+    '亡霊': ('幽灵', False),
+    '英雄': ('英雄', False),
+    '判事': ('法官', False),
+    '探偵': ('侦探', False),
+    '司法': ('司法', False),
+    '証人': ('证人', False),
+    '罪人': ('罪人', False),
+    '報酬': ('报酬', False),
+    '策士': ('谋士', False),
+    '生贄': ('牺牲品', False),
+    '親友': ('挚友', True),
+    '父': ('父亲', True),
+    '母': ('母亲', True),
+    '妹': ('妹妹', True),
+    '娘': ('女儿', False),
+    '姉': ('姐姐', True),
+    '姪': ('侄女/侄子', True),
+    '兄': ('兄弟', True),
+    '孫': ('孙子/孙女', True),
+    '妻': ('妻子', True),
+    '夫': ('丈夫', True),
+    '妾': ('小妾', False),
+    '帝': ('皇帝', False),
+    '妃': ('妃子', False),
+    '君': ('君主', False),
+    '侍': ('侍', False),
+    '姫': ('公主', False),
+    '敵': ('敌人', False),
+    '竜': ('龙', False),
+}
+# 预筛选: 标签只来自"の"之后出现的词条, 或去掉"本編の"等前缀后与整句相同的词条
+JA_TERMS_RE = re.compile("|".join(re.escape(key) for key in sorted(JA_TERMS, key=len, reverse=True)))
+JA_PREFIX_RE = re.compile(r"本(?:編|作品?)の")
+
+
+def get_token_info(token: Token) -> tuple[str, str]:
+    if token.extra:
+        return token.extra[0], token.node.surface
+    return token.node.part_of_speech, token.node.surface
+
+
+def iter_chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class CharacterBuilder:
+    # 保存加载的数据与处理过程中的统计
+    def __init__(self, data: BuildData) -> None:
+        self.data = data
+        self.maybe_ja_names: list[str] = []
+        self.info_match_count = 0  # 匹配到的角色信息数量
+        self.tags_match_count = 0  # 匹配到的标签数量
+        self.no_zh_count = 0  # 没有中文名的角色数量
+        self.no_ja_count = 0
+        self.janome_tokenized = 0  # 经过Janome分词的日文句子数量
+        self.janome_skipped = 0  # 预筛选跳过的日文句子数量
+
+    def counts(self) -> list[int]:
+        return [self.info_match_count, self.tags_match_count, self.no_zh_count, self.no_ja_count]
+
+    def is_from_ja_subject(self, subjects: list[dict]) -> bool:
+        subject_ids = [subject["id"] for subject in subjects]
+        for subject_id in subject_ids:
+            subject = self.data.o_subjects_dict.get(subject_id)
+            if subject is None:
+                continue
+            if include_japanese(subject["name"]):
+                return True
+            tags = [t["name"] for t in subject.get("tags", [])]
+            for tag in tags:
+                if tag in ["日本", "日本动画", "日本漫画", "日系"]:
+                    return True
+        return False
+
+    def is_from_zh_subject(self, subjects: list[dict]) -> bool:
+        subject_ids = [subject["id"] for subject in subjects]
+        for subject_id in subject_ids:
+            subject = self.data.o_subjects_dict.get(subject_id)
+            if subject is None:
+                continue
+            tags = [t["name"] for t in subject.get("tags", [])]
+            for tag in tags:
+                if tag in [
+                    "国产",
+                    "中国",
+                    "中国动画",
+                    "国产动画",
+                    "国产游戏",
+                    "中国大陆",
+                    "国产Galgame",
+                ]:
+                    return True
+        return False
+
+    def get_jawiki_text(self, names: list[str], subjects: list[dict]) -> tuple[list, list]:
+        result = []
+        w_names = []
+        for name in names:
+            id_names = self.data.jawiki_mapping.get(name, [])
+            for id_name in id_names:
+                w_id = id_name[0]
+                w_name = id_name[1]
+                w_subjecs = self.data.jawiki[w_id]["titles"]
+                for subject in subjects:
+                    for w_subject in w_subjecs:
+                        if subject_name_compare(w_subject, subject["name"]):
+                            w_names += get_jawiki_char_names(w_name)
+                            result.append(self.data.jawiki[w_id]["char"][w_name].strip())
+        return list(dict.fromkeys(result)), list(dict.fromkeys(w_names))
+
+    def analyze(self, names: list[str], subjects: list[dict], summary: str) -> tuple[list, list]:  # noqa: PLR0915
+        t = tokenizer()
+
+        def p(summary: str) -> list:  # noqa: PLR0915
+            result = []
+            summary = summary.strip()
+            if not summary:
+                return result
+            is_ja = text_includes_kana(summary)
+            summary_s: list[str] = re.split(r"[。，,]|\r\n", summary)
+            summary_s: list[str] = [s for s in summary_s if s.strip() != ""]
+            zh_num = [
+                "一",
+                "二",
+                "三",
+                "四",
+                "五",
+                "六",
+                "七",
+                "八",
+                "九",
+                "十",
+                "十一",
+                "十二",
+                "十三",
+                "十四",
+                "十五",
+                "十六",
+                "十七",
+                "十八",
+                "十九",
+                "二十",
+            ]
+            zh_num_re = rf"(?:{'|'.join(zh_num)})"
+            zh = {
+                re.compile(r"(?:男|女)?主角"): False,
+                re.compile(r"(?:男|女)?主人公"): False,
+                "主要人物": False,
+                "妹妹": True,
+                "姊姊": True,
+                "姊夫": True,
+                "姐姐": True,
+                "哥哥": True,
+                re.compile(r"(?:亲生)?父亲"): True,
+                re.compile(r"(?:亲生)?母亲"): True,
+                "爷爷": True,
+                "奶奶": True,
+                "外公": True,
+                "外婆": True,
+                re.compile(r"外?祖父"): True,
+                re.compile(r"外?祖母"): True,
+                "丈夫": True,
+                "妻子": True,
+                re.compile(r"前?恋人"): True,
+                re.compile(r"前?(?:男|女)朋友"): True,
+                re.compile(r"前(?:夫|妻)"): True,
+                "团长": True,
+                re.compile(r"(?:大|小)?儿子"): True,
+                re.compile(r"(?:大|小)?女儿"): True,
+                "混血儿": False,
+                "独生(?:女|子)": True,
+                re.compile(r"骑士"): False,
+                re.compile(r"(?:转|留|男|女|.年级)?学生"): False,
+                re.compile(r"(?:大学|高中|初中|小学)生"): False,
+                re.compile(r"(?:后|前)辈"): True,
+                "师弟": True,
+                "师妹": True,
+                "店小二": False,
+                re.compile(r"美?少女"): False,
+                "搭档": True,
+                "少年": False,
+                "伙伴": False,
+                "小姐": False,
+                "千金": False,
+                "随侍": False,
+                "隨從": False,
+                "从者": True,
+                "拥有者": True,
+                "专家": False,
+                "超能力者": False,
+                re.compile(r"(?:男|女)孩"): False,
+                "同班同学": True,
+                re.compile(r"(?:男|女)?医生"): False,
+                re.compile(r"(?:男|女)?警察"): False,
+                re.compile(r"(?:男|女)?老师"): False,
+                "刑警": False,
+                "(?:天才)?黑客": False,
+                "制作人": True,
+                "当家": True,
+                "助手": True,
+                "女仆": False,
+                "故友": True,
+                "飞行员": False,
+                "科学家": False,
+                "研究员": False,
+                "首领": True,
+                re.compile(rf"第?{zh_num_re}公主"): False,
+            }
+            ja = JA_TERMS
+            if is_ja:
+                # 最后一个可能产生标签的句子之后的句子无需处理, 之前的句子仍需分词以便遇到动词时停止
+                last = -1
+                for index, s in enumerate(summary_s):
+                    if ("の" in s and JA_TERMS_RE.search(s)) or JA_PREFIX_RE.sub("", s).strip() in ja:
+                        last = index
+                self.janome_skipped += len(summary_s) - last - 1
+                summary_s = summary_s[:last + 1]
+            for index, s in enumerate(summary_s):
+                verb = False
+                if is_ja:
+                    key = JA_PREFIX_RE.sub("", s).strip()
+                    if key in ja:
+                        result.append(ja[key][0])
+                    self.janome_tokenized += 1
+                    tokens = [get_token_info(token) for token in t.tokenize(s)]
+                    for i, token in enumerate(tokens):
+                        if "動詞" in token[0]:
+                            verb = True
+                            break
+                        if token[1] == "の":
+                            before = ""
+                            for t_ in tokens[:i][::-1]:
+                                if t_[0].startswith("名詞"):
+                                    before = t_[1] + before
+                                else:
+                                    break
+                            if before == "" or before.strip() in ["腹違い"]:
+                                continue
+                            after = ""
+                            for t_ in tokens[i + 1:i + 4]:
+                                after += t_[1]
+                                if after in ja:
+                                    ja_ = ja[after]
+                                    if ja_[1]:
+                                        result.append(before + "的" + ja_[0])
+                                    else:
+                                        result.append(ja_[0])
+                    if verb:
+                        break
+
+                else:
+                    if (
+                        "不是" in s
+                        or "有" in s
+                        or "去" in s
+                        or "着" in s
+                        or "与" in s
+                        or "所以" in s
+                        or "为了" in s
+                    ):
+                        continue
+                    if index == 0:
+                        for key in zh:
+                            match = re.match(key, s)
+                            if match:
+                                match_str = match.string[
+                                    match.regs[0][0]: match.regs[0][1]
+                                ]
+                                result.append(match_str)
+                    if "的" in s:
+                        to_match = s.split("的")[-1]
+                        header = "".join(s.split("的")[:-1]) + "的"
+                        if "是" in header:
+                            header = header.split("是")[-1]
+                        for key, value in zh.items():
+                            match = re.match(key, to_match)
+                            if match:
+                                match_str = match.string[
+                                    match.regs[0][0]: match.regs[0][1]
+                                ]
+                                if value:
+                                    result.append(header + match_str)
+                                else:
+                                    result.append(match_str)
+
+            return list(dict.fromkeys(result))
+
+        result = []
+        jawiki_texts, w_names = self.get_jawiki_text(names, subjects)
+        if jawiki_texts:
+            for jawiki_text in jawiki_texts:
+                result.extend(p(jawiki_text))
+        if summary is not None:
+            result.extend(p(summary))
+        return list(dict.fromkeys(result)), w_names
+
+    def process_content(self, content: dict, info: dict) -> tuple[dict, list[str]]:  # noqa: PLR0915
+        name: list[str] = info["name"]
+        zh_name: list[str] = info["zh_name"] + info["zh_name2"]
+        ja_name: list[str] = info["ja_name"] + info["ja_name2"]
+        kana_name: list[str] = info["kana_name"] + info["kana_name2"]
+        en_name: list[str] = info["en_name"] + info["en_name2"]
+        gender: str = info["gender"]
+        nick_name: list[str] = info["nick_name"] + info["nick_name2"]
+        info = None
+
+        subjects = self.data.subjects_mapping.get(content["id"], [])
+
+        if not zh_name:
+            for n in name:
+                if (
+                    self.is_from_zh_subject(subjects) or not self.is_from_ja_subject(subjects)
+                ) and is_zh_name(n):
+                    zh_name.append(n)
+
+        if not ja_name:
+            for n in name:
+                if (
+                    (
+                        (n not in zh_name or self.is_from_ja_subject(subjects))
+                        and not is_english_with_symbols(n)
+                        and is_japanese(n)
+                    )
+                    or is_jp_name(n)
+                ) and (not self.is_from_zh_subject(subjects) or include_japanese(n)):
+                    ja_name.append(n)
+                elif not is_english_with_symbols(n) and is_japanese(n):
+                    self.maybe_ja_names.append(n)
+            if not ja_name and not kana_name:  # noqa: SIM114
+                self.no_ja_count += 1
+                # logging.warning(f"{json.dumps(content, ensure_ascii=False, indent=4)}未获取到日文名")
+                # continue
+            elif not ja_name:
+                self.no_ja_count += 1
+                # logging.warning(f"{json.dumps(content, ensure_ascii=False, indent=4)}未获取到日文名, 但有假名")
+
+        if not zh_name:
+            for ja_n in [*ja_name, *name]:
+                if re.fullmatch(r"[\u4E00-\u9FFF· ]+", ja_n):
+                    zh_name.append(t2s_converter().convert(ja_n.replace(" ", "")))
+
+        if not zh_name:
+            self.no_zh_count += 1
+            # logging.warning(f"{json.dumps(content, ensure_ascii=False, indent=4)}未获取到中文名")
+            # continue
+
+        # 匹配VNDB中的角色信息
+        names = zh_name + ja_name + en_name + [name.replace(" ", "") for name in ja_name]
+        for _name in names:
+            if _name in self.data.name_chars_mapping:
+                char_ids = self.data.name_chars_mapping[_name]
+                if len(char_ids) == 1:
+                    info = self.data.chars[char_ids[0]].copy()
+                    self.info_match_count += 1
+                    break
+                else:
+                    # 如果匹配到多个角色, 则只在与角色的subject对应的vn中出现的VNDB角色里选择
+                    subject_vns = set()
+                    for subject in subjects:
+                        subject_vns.update(self.data.subject_vns.get(subject["id"], ()))
+                    candidates = [
+                        self.data.chars[char_id] for char_id in char_ids
+                        if not subject_vns.isdisjoint(self.data.chars_vns.get(char_id, ()))
+                    ]
+
+                    # 完全匹配
+                    for char in candidates:
+                        subject_list = char.get("subjects", [])
+                        for subject in subject_list:
+                            if subject in [subject["name"] for subject in subjects] + [
+                                subject["zh_name"] for subject in subjects
+                            ]:
+                                info = char.copy()
+                                self.info_match_count += 1
+                                break
+                        else:
+                            continue
+                        break
+                    else:
+                        # 对应表与subject_name_compare判断一致, 候选角色都有标题与subject匹配
+                        if not candidates:
+                            # 匹配到多个角色,且无法区分
+                            continue
+                        info = candidates[0].copy()
+                        self.info_match_count += 1
+
+                break
+
+        tags, ext_names = self.analyze(names, subjects, content["summary"])
+
+        if info:
+            ext_names.append(info["name"])
+            info.pop("name")
+            if info["latin"] and info["latin"] not in en_name:
+                en_name.append(info["latin"])
+            info.pop("latin")
+
+        for name in ext_names:
+            if name and name not in ja_name and is_japanese(name):
+                for i, ja_name_ in enumerate(ja_name):
+                    if (
+                        "・" not in ja_name_
+                        and " " not in ja_name_
+                        and " " in name
+                        and ja_name_ == name.replace(" ", "")
+                    ):
+                        ja_name[i] = name
+                        break
+                else:
+                    for _name in re.split(r"[／/、]", name):
+                        if re.fullmatch(r"[\u3040-\u309F\u30A0-\u30FF・ ]+", _name) and _name not in kana_name:
+                            kana_name.append(_name)
+                        elif (_name not in kana_name
+                                and (
+                                " " in _name
+                                or "・" in _name
+                                or _name not in [re.sub(r"[・ ]", "", n_) for n_ in ja_name])):
+                            ja_name.extend(_name)
+
+        for ja_n in ja_name:  # 处理假名
+            if re.fullmatch(r"[\u3040-\u309F\u30A0-\u30FF・ ]+", ja_n):
+                ja_name.remove(ja_n)
+                if ja_n not in kana_name:
+                    kana_name.append(ja_n)
+
+        if tags:
+            self.tags_match_count += 1
+
+        result = {
+            "id": content["id"],
+            "zh": list(dict.fromkeys(zh_name)),
+            "ja": list(dict.fromkeys(ja_name)),
+            "en": list(dict.fromkeys(en_name)),
+            "kana": list(dict.fromkeys(kana_name)),
+            "nick_name": list(dict.fromkeys(nick_name)),
+            "gender": gender,
+            "subjects": subjects,
+            "info": info,
+            "tags": tags,
+        }
+        return result, names
+
+    def process_contents(
+        self, contents: Iterable[dict], cache: IncrementalCache | None = None, chunk_size: int = CHUNK_SIZE,
+    ) -> Iterator[dict]:
+        # 按块处理: 先解析一块角色的infobox, 收集其中所有可能需要转换的名称, 批量转换后再逐个处理
+        s2t, t2s = s2t_converter(), t2s_converter()
+        for chunk in iter_chunks(contents, chunk_size):
+            cached = [cache.get(content) if cache else (None, None) for content in chunk]
+            infos = [get_infobox_info(content) for content, (_, state) in zip(chunk, cached, strict=True) if state is None]
+            s2t_texts, t2s_texts = [], []
+            for info in infos:
+                s2t_candidates, t2s_candidates = get_opencc_candidates(info)
+                s2t_texts.extend(s2t_candidates)
+                t2s_texts.extend(t2s_candidates)
+            s2t.clear()
+            t2s.clear()
+            s2t.prime(s2t_texts)
+            t2s.prime(t2s_texts)
+            infos = iter(infos)
+            for content, (content_fp, state) in zip(chunk, cached, strict=True):
+                if state is None:
+                    counts = self.counts()
+                    maybe_count = len(self.maybe_ja_names)
+                    result, names = self.process_content(content, next(infos))
+                    if cache:
+                        counts = [new - old for new, old in zip(self.counts(), counts, strict=True)]
+                        cache.add(content_fp, result, names, counts, self.maybe_ja_names[maybe_count:])
+                        cache.processed += 1
+                else:
+                    # 复用上次的结果, 并还原处理该角色时对统计与maybe_ja_names的影响
+                    result = state["result"]
+                    info_delta, tags_delta, no_zh_delta, no_ja_delta = state["counts"]
+                    self.info_match_count += info_delta
+                    self.tags_match_count += tags_delta
+                    self.no_zh_count += no_zh_delta
+                    self.no_ja_count += no_ja_delta
+                    self.maybe_ja_names.extend(state["maybe_ja_names"])
+                    cache.add(content_fp, result, state["names"], state["counts"], state["maybe_ja_names"],
+                              state["dependencies"])
+                    cache.reused += 1
+                yield result
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 维基百科提取的检查点: 已处理的条目随时追加到磁盘, 定期记录进度, 中断后可从上次的检查点继续
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import textwrap
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL_S = 60  # 两次保存检查点的最短间隔
+
+
+def write_json_object(path: str, items: Iterable[tuple[object, object]]) -> None:
+    # 与 json.dump(dict(items), file, ensure_ascii=False, indent=4) 输出相同, 但无需将所有条目保存在内存中
+    with open(path, "w", encoding="utf-8") as file:
+        first = True
+        for key, value in items:
+            file.write("{\n" if first else ",\n")
+            value_text = textwrap.indent(json.dumps(value, ensure_ascii=False, indent=4), "    ")
+            file.write(f"    {json.dumps(str(key), ensure_ascii=False)}: {value_text[4:]}")
+            first = False
+        file.write("{}" if first else "\n}")
+
+
+def merge_counts(*counts: dict[str, int]) -> dict[str, int]:
+    merged: dict[str, int] = {}
+    for count in counts:
+        for name, n in count.items():
+            merged[name] = merged.get(name, 0) + n
+    return merged
+
+
+class Checkpoint:
+    # subjects.jsonl 每行为 [页面id, 条目]; state.json 记录已完成的单位数(页面或multistream的段)、
+    # subjects.jsonl 中对应的有效长度与继续运行所需的其他状态. 恢复时截掉有效长度之后的内容
+    def __init__(self, directory: str, source: dict, interval: float = CHECKPOINT_INTERVAL_S, resume: bool = False) -> None:
+        self.directory = directory
+        self.state_path = os.path.join(directory, "state.json")
+        self.subjects_path = os.path.join(directory, "subjects.jsonl")
+        self.interval = interval
+        self.state = {"version": CHECKPOINT_VERSION, "source": source, "done": 0, "subjects_size": 0, "progress": {}}
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as file:
+                state = json.load(file)
+            if state.get("version") != CHECKPOINT_VERSION or state.get("source") != source:
+                msg = f"检查点{directory}与当前输入不一致: {state.get('source')} != {source}"
+                raise ValueError(msg)
+            self.state = state
+            logging.info(f"从检查点继续: 已完成{state['done']}, 已保存{state['subjects_size']}字节的条目")
+        else:
+            if resume:
+                logging.warning(f"{directory}中没有检查点, 将从头开始")
+            shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(self.subjects_path, "ab")  # noqa: SIM115
+        self.file.truncate(self.state["subjects_size"])
+        self.file.seek(self.state["subjects_size"])
+        self.last_save = time.monotonic()
+
+    @property
+    def done(self) -> int:
+        return self.state["done"]
+
+    @property
+    def progress(self) -> dict:
+        return self.state["progress"]
+
+    def add(self, page_id: int, subject: dict) -> None:
+        self.file.write((json.dumps([page_id, subject], ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def save(self, done: int, progress: dict, force: bool = False) -> None:
+        if not force and time.monotonic() - self.last_save < self.interval:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.state.update(done=done, subjects_size=self.file.tell(), progress=progress)
+        with open(self.state_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.state, file, ensure_ascii=False)
+        os.replace(self.state_path + ".tmp", self.state_path)
+        self.last_save = time.monotonic()
+
+    def iter_subjects(self) -> Iterator[tuple[int, dict]]:
+        self.file.flush()
+        with open(self.subjects_path, encoding="utf-8") as file:
+            for line in file:
+                page_id, subject = json.loads(line)
+                yield page_id, subject
+
+    def remove(self) -> None:
+        self.file.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
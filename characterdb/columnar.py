@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 将VNDB角色信息中的数值字段导出为列式的 .npz, 每个字段一列并附带是否有值的掩码
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import numpy as np
+
+COLUMNAR_PATH = "character_numeric.npz"
+# info中的数值字段, 在VNDB的chars表中均为整数, 以字符串保存
+NUMERIC_FIELDS = ("height", "weight", "bust", "waist", "s_hip", "age", "b_month", "b_day")
+
+
+def parse_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def write_columnar(records: Iterable[dict], path: str = COLUMNAR_PATH) -> int:
+    # 列:
+    #   id: bangumi角色id
+    #   vndb_id: 匹配到的VNDB角色id(去掉前缀c), vndb_id_mask为False表示没有匹配到
+    #   各数值字段及其 {字段}_mask
+    # 逐条追加到 array 中, 最后一次性转换为NumPy数组, 不保留记录本身
+    import numpy as np  # noqa: PLC0415
+
+    ids = array("q")
+    columns = {field: array("i") for field in ("vndb_id", *NUMERIC_FIELDS)}
+    masks = {field: bytearray() for field in columns}
+    for record in records:
+        ids.append(record["id"])
+        info = record["info"] or {}
+        values = {field: parse_int(info.get(field)) for field in NUMERIC_FIELDS}
+        values["vndb_id"] = parse_int(info["id"].removeprefix("c")) if info else None
+        for field, value in values.items():
+            columns[field].append(0 if value is None else value)
+            masks[field].append(value is not None)
+
+    arrays: dict[str, np.ndarray] = {"id": np.frombuffer(ids, dtype=np.int64)}
+    for field, column in columns.items():
+        arrays[field] = np.frombuffer(column, dtype=np.intc)
+        arrays[f"{field}_mask"] = np.frombuffer(masks[field], dtype=np.bool_)
+    np.savez(path, **arrays)
+    return len(ids)
+
+
+def load_columnar(path: str = COLUMNAR_PATH) -> dict[str, np.ndarray]:
+    # 数值字段以 numpy.ma.MaskedArray 返回, 缺失值被屏蔽
+    import numpy as np  # noqa: PLC0415
+
+    with np.load(path) as data:
+        columns = {"id": data["id"]}
+        for field in ("vndb_id", *NUMERIC_FIELDS):
+            columns[field] = np.ma.MaskedArray(data[field], mask=~data[f"{field}_mask"])
+    return columns
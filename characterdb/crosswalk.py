@@ -0,0 +1,48 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# bangumi subject 与 VNDB vn 的对应表, 由标题匹配得到
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from characterdb.names import normalize_subject_name
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+SUBJECT_PREFIX_LENGTH = 4  # 规范化后长于该长度的标题, 前缀相同即视为同一作品
+
+
+class TitleIndex:
+    # 按规范化后的标题与前4个字符建立索引, match的结果与逐个调用 subject_name_compare 完全一致:
+    # 规范化后相同, 或两者都长于4个字符且前4个字符相同
+    def __init__(self) -> None:
+        self.by_name: dict[str, set] = {}
+        self.by_prefix: dict[str, set] = {}
+
+    def add(self, key: object, title: str) -> None:
+        name = normalize_subject_name(title)
+        self.by_name.setdefault(name, set()).add(key)
+        if len(name) > SUBJECT_PREFIX_LENGTH:
+            self.by_prefix.setdefault(name[:SUBJECT_PREFIX_LENGTH], set()).add(key)
+
+    def match(self, title: str) -> set:
+        name = normalize_subject_name(title)
+        keys = set(self.by_name.get(name, ()))
+        if len(name) > SUBJECT_PREFIX_LENGTH:
+            keys.update(self.by_prefix.get(name[:SUBJECT_PREFIX_LENGTH], ()))
+        return keys
+
+
+def build_subject_vn_crosswalk(subjects: Iterable[dict], vn_titles: dict[str, list]) -> dict[int, list[str]]:
+    index = TitleIndex()
+    for vn_id, titles in vn_titles.items():
+        for title in titles:
+            index.add(vn_id, title)
+
+    crosswalk = {}
+    for subject in subjects:
+        vn_ids = index.match(subject["name"]) | index.match(subject["name_cn"])
+        if vn_ids:
+            crosswalk[subject["id"]] = sorted(vn_ids)
+    return crosswalk
@@ -0,0 +1,162 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 发布文件的增量: 按id对上次与本次的 character.jsonl 做归并连接, 只记录新增、删除与变化的记录
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+DELTA_VERSION = 1
+
+
+def iter_records(path: str, digest: hashlib._Hash | None = None) -> Iterator[tuple[int, bytes]]:
+    # 逐行返回 (id, 原始行), 两个文件都必须按id严格递增(p.py与merge_shards.py的输出均按id排列)
+    last_id = None
+    with open(path, "rb") as file:
+        for line in file:
+            if digest is not None:
+                digest.update(line)
+            record_id = json.loads(line)["id"]
+            if last_id is not None and record_id <= last_id:
+                msg = f"{path}未按id升序排列: {last_id}之后为{record_id}"
+                raise ValueError(msg)
+            last_id = record_id
+            yield record_id, line
+
+
+def file_info(digest: hashlib._Hash, records: int) -> dict:
+    return {"sha256": digest.hexdigest(), "records": records}
+
+
+def diff(old_path: str, new_path: str, output: str) -> dict:
+    # 增量文件第一行为两个文件的sha256与各操作数量, 之后按id顺序每行一个操作:
+    # {"op": "add"|"change", "record": {...}} 或 {"op": "remove", "id": ...}
+    old_digest, new_digest = hashlib.sha256(), hashlib.sha256()
+    counts = {"added": 0, "removed": 0, "changed": 0}
+    old_records = new_records = 0
+    old_iter = iter_records(old_path, old_digest)
+    new_iter = iter_records(new_path, new_digest)
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+    with open(output + ".ops", "w", encoding="utf-8") as ops:
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                ops.write(json.dumps({"op": "remove", "id": old[0]}, ensure_ascii=False) + "\n")
+                counts["removed"] += 1
+                old_records += 1
+                old = next(old_iter, None)
+            elif old is None or new[0] < old[0]:
+                ops.write(json.dumps({"op": "add", "record": json.loads(new[1])}, ensure_ascii=False) + "\n")
+                counts["added"] += 1
+                new_records += 1
+                new = next(new_iter, None)
+            else:
+                if old[1] != new[1]:
+                    ops.write(json.dumps({"op": "change", "record": json.loads(new[1])}, ensure_ascii=False) + "\n")
+                    counts["changed"] += 1
+                old_records += 1
+                new_records += 1
+                old = next(old_iter, None)
+                new = next(new_iter, None)
+
+    header = {
+        "version": DELTA_VERSION,
+        "old": file_info(old_digest, old_records),
+        "new": file_info(new_digest, new_records),
+        **counts,
+    }
+    with open(output, "w", encoding="utf-8") as file, open(output + ".ops", encoding="utf-8") as ops:
+        file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        shutil.copyfileobj(ops, file)
+    os.remove(output + ".ops")
+    return header
+
+
+def apply_records(old_path: str, delta_path: str, output: str) -> dict:
+    # 逐行归并上次的文件与增量, 未变化的记录原样复制, 并核对两个文件的sha256与记录数
+    old_digest, new_digest = hashlib.sha256(), hashlib.sha256()
+    old_records = new_records = 0
+    with open(delta_path, encoding="utf-8") as delta, open(output, "wb") as out:
+        header = json.loads(delta.readline())
+        if header.get("version") != DELTA_VERSION:
+            msg = f"不支持的增量文件版本: {header.get('version')}"
+            raise ValueError(msg)
+
+        def write(line: bytes) -> None:
+            nonlocal new_records
+            out.write(line)
+            new_digest.update(line)
+            new_records += 1
+
+        old_iter = iter_records(old_path, old_digest)
+        old = next(old_iter, None)
+        for op_line in delta:
+            op = json.loads(op_line)
+            op_id = op["id"] if op["op"] == "remove" else op["record"]["id"]
+            while old is not None and old[0] < op_id:
+                write(old[1])
+                old_records += 1
+                old = next(old_iter, None)
+            exists = old is not None and old[0] == op_id
+            if exists == (op["op"] == "add"):
+                msg = f"增量与上次的文件不匹配: id {op_id} 的操作为{op['op']}"
+                raise ValueError(msg)
+            if exists:
+                old_records += 1
+                old = next(old_iter, None)
+            if op["op"] != "remove":
+                write((json.dumps(op["record"], ensure_ascii=False) + "\n").encode("utf-8"))
+        while old is not None:
+            write(old[1])
+            old_records += 1
+            old = next(old_iter, None)
+
+    for name, info in (("old", file_info(old_digest, old_records)), ("new", file_info(new_digest, new_records))):
+        if info != header[name]:
+            msg = f"{name}文件与增量中记录的不一致: {info} != {header[name]}"
+            raise ValueError(msg)
+    return header
+
+
+def apply(old_path: str, delta_path: str, output: str) -> dict:
+    # 先写入临时文件, 校验失败时不保留输出
+    try:
+        header = apply_records(old_path, delta_path, output + ".tmp")
+    except BaseException:
+        if os.path.exists(output + ".tmp"):
+            os.remove(output + ".tmp")
+        raise
+    os.replace(output + ".tmp", output)
+    return header
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    diff_parser = subparsers.add_parser("diff", help="生成从上次发布的文件到本次文件的增量")
+    diff_parser.add_argument("old", type=str)
+    diff_parser.add_argument("new", type=str)
+    diff_parser.add_argument("--output", type=str, required=True)
+    apply_parser = subparsers.add_parser("apply", help="将增量应用到上次发布的文件")
+    apply_parser.add_argument("old", type=str)
+    apply_parser.add_argument("delta", type=str)
+    apply_parser.add_argument("--output", type=str, required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        header = diff(args.old, args.new, args.output)
+    else:
+        header = apply(args.old, args.delta, args.output)
+    logging.info(
+        f"{header['old']['records']}条 → {header['new']['records']}条: "
+        f"新增{header['added']}, 删除{header['removed']}, 变化{header['changed']}",
+    )
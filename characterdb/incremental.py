@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 增量构建: 复用上次运行中输入未变化的角色的结果
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from importlib.metadata import version
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from characterdb.loader import BuildData
+
+INCREMENTAL_VERSION = 1  # 修改会影响输出的逻辑但未改动SOURCE_MODULES的源码时(如依赖的数据格式)需要增加
+# 这些模块的源码变化时, 上次的结果全部失效
+SOURCE_MODULES = ("build", "builder", "crosswalk", "loader", "names", "resources")
+
+
+def source_files() -> list[str]:
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = []
+    for module in SOURCE_MODULES:
+        with open(os.path.join(package_dir, f"{module}.py"), "rb") as file:
+            sources.append(file.read().decode("utf-8"))
+    return sources
+
+
+def fingerprint(value: object) -> str:
+    return hashlib.blake2b(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_fingerprint(data: BuildData, content: dict) -> str:
+    # 角色自身及其关联subject的所有会影响结果的输入
+    subjects = data.subjects_mapping.get(content["id"], [])
+    subject_tags = [
+        sorted({tag["name"] for tag in data.o_subjects_dict.get(subject["id"], {}).get("tags", [])}) for subject in subjects
+    ]
+    return fingerprint(
+        [content["id"], content["name"], content["infobox"], content["summary"], subjects, subject_tags],
+    )
+
+
+def dependency_fingerprint(data: BuildData, names: list[str]) -> str:
+    # 以这些名称在VNDB与jawiki中能查到的所有数据
+    dependencies = []
+    for name in names:
+        char_ids = data.name_chars_mapping.get(name)
+        if char_ids:
+            dependencies.append([name, char_ids, [data.chars[char_id] for char_id in char_ids]])
+        id_names = data.jawiki_mapping.get(name)
+        if id_names:
+            dependencies.append([
+                name,
+                [[w_id, w_name, sorted(data.jawiki[w_id]["titles"]), data.jawiki[w_id]["char"][w_name]] for w_id, w_name in id_names],
+            ])
+    return fingerprint(dependencies)
+
+
+class IncrementalCache:
+    # 上次运行的各角色指纹保存在 fingerprints.jsonl, 与上次的 character.jsonl 逐行对应, 均按字节偏移读取
+    # 指纹分两部分: 角色自身的输入, 以及用上次得到的名称在VNDB/jawiki中查到的数据; 两者都未变化时直接复用上次的结果
+    def __init__(self, directory: str, data: BuildData) -> None:
+        self.directory = directory
+        self.data = data
+        self.fingerprints_path = os.path.join(directory, "fingerprints.jsonl")
+        self.character_path = os.path.join(directory, "character.jsonl")
+        self.global_fingerprint = fingerprint(
+            [INCREMENTAL_VERSION, source_files(), data.jp_surnames, version("janome"), version("opencc")],
+        )
+        self.index: dict[int, tuple[str, int, int]] = {}
+        self.reused = self.processed = 0
+        self.load()
+        self.old_fingerprints = open(self.fingerprints_path, "rb") if self.index else None  # noqa: SIM115
+        self.old_characters = open(self.character_path, "rb") if self.index else None  # noqa: SIM115
+        os.makedirs(directory, exist_ok=True)
+        self.new_fingerprints = open(self.fingerprints_path + ".tmp", "w", encoding="utf-8")  # noqa: SIM115
+        self.new_fingerprints.write(json.dumps({"version": INCREMENTAL_VERSION, "global": self.global_fingerprint}) + "\n")
+
+    def load(self) -> None:
+        if not os.path.exists(self.fingerprints_path) or not os.path.exists(self.character_path):
+            logging.info("增量构建: 没有上次的结果, 将处理所有角色")
+            return
+        with open(self.fingerprints_path, "rb") as fingerprints_file, open(self.character_path, "rb") as character_file:
+            header = json.loads(fingerprints_file.readline())
+            if header.get("version") != INCREMENTAL_VERSION or header.get("global") != self.global_fingerprint:
+                logging.info("增量构建: 代码或全局数据已变化, 将处理所有角色")
+                return
+            offset = fingerprints_file.tell()
+            character_offset = 0
+            for line in fingerprints_file:
+                character_line = character_file.readline()
+                if not character_line:
+                    logging.warning("增量构建: character.jsonl 与 fingerprints.jsonl 行数不一致, 将处理所有角色")
+                    self.index.clear()
+                    return
+                state = json.loads(line)
+                self.index[state["id"]] = (state["fingerprint"], offset, character_offset)
+                offset += len(line)
+                character_offset += len(character_line)
+        logging.info(f"增量构建: 已加载{len(self.index)}个角色的指纹")
+
+    def get(self, content: dict) -> tuple[str, dict | None]:
+        # 返回 (角色自身输入的指纹, 可复用的上次状态)
+        content_fp = content_fingerprint(self.data, content)
+        entry = self.index.get(content["id"])
+        if entry is None or entry[0] != content_fp:
+            return content_fp, None
+        self.old_fingerprints.seek(entry[1])
+        state = json.loads(self.old_fingerprints.readline())
+        if dependency_fingerprint(self.data, state["names"]) != state["dependencies"]:
+            return content_fp, None
+        self.old_characters.seek(entry[2])
+        state["result"] = json.loads(self.old_characters.readline())
+        return content_fp, state
+
+    def add(self, content_fp: str, result: dict, names: list[str], counts: list[int], maybe_names: list[str],
+            dependencies: str | None = None) -> None:
+        state = {
+            "id": result["id"],
+            "fingerprint": content_fp,
+            "dependencies": dependencies or dependency_fingerprint(self.data, names),
+            "names": names,
+            "counts": counts,
+            "maybe_ja_names": maybe_names,
+        }
+        self.new_fingerprints.write(json.dumps(state, ensure_ascii=False) + "\n")
+
+    def commit(self) -> None:
+        # 在 character.jsonl 写出完成后调用, 保存本次结果供下次使用
+        for file in (self.old_fingerprints, self.old_characters):
+            if file is not None:
+                file.close()
+        self.new_fingerprints.close()
+        shutil.copyfile("character.jsonl", self.character_path + ".tmp")
+        os.replace(self.character_path + ".tmp", self.character_path)
+        os.replace(self.fingerprints_path + ".tmp", self.fingerprints_path)
+        logging.info(f"增量构建: 复用{self.reused}个角色, 重新处理{self.processed}个角色")
@@ -0,0 +1,447 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 加载bangumi、VNDB与jawiki数据
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import TYPE_CHECKING
+
+from tqdm import tqdm
+
+from characterdb.builder import get_infobox_info
+from characterdb.crosswalk import TitleIndex, build_subject_vn_crosswalk
+from characterdb.names import get_jawiki_char_names
+from characterdb.resources import jp_surnames, t2s_converter
+from characterdb.run_report import run_stage
+from characterdb.shard import in_shard
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Container, Iterator
+
+    from characterdb.run_report import RunReport, Stage
+
+# subject.jsonlines中用到的字段, 其余(infobox、summary等)不保留
+SUBJECT_FIELDS = ("id", "name", "name_cn", "type", "tags")
+# process_content 在VNDB中查找的名称都来自这些info键
+LOOKUP_NAME_FIELDS = ("name", "zh_name", "zh_name2", "ja_name", "ja_name2", "en_name", "en_name2")
+
+
+@dataclass
+class BuildData:
+    # 流式模式下为None, 角色在处理时逐行读取
+    contents: list[dict] | None
+    subjects_mapping: dict
+    o_subjects_dict: dict
+    jp_surnames: list
+    name_chars_mapping: dict[str, list[dict]]
+    chars: dict[str, dict]
+    jawiki_mapping: dict[str, tuple[str, str]]
+    jawiki: dict[str, dict]
+    chars_vns: dict[str, list]
+    # bangumi subject id -> 标题匹配的VNDB vn id
+    subject_vns: dict[int, list[str]]
+
+
+@dataclass(frozen=True)
+class Loader:
+    # 阶段名, 同时作为结果的键
+    name: str
+    # func(stage, *依赖的结果)
+    func: Callable[..., object]
+    deps: tuple[str, ...] = ()
+    # 在主线程中执行: 需要依赖的完整结果或要修改它们; 使用进程池时放到子进程中只会增加序列化的开销
+    inline: bool = False
+
+
+def load_jp_surnames(stage: Stage) -> list:
+    # 名称判断使用主进程中的缓存, 因此在主进程中加载
+    surnames = jp_surnames()
+    stage.items_out = len(surnames)
+    return surnames
+
+
+def load_jawiki(stage: Stage, o_subjects_dict: dict | None = None) -> tuple[dict, dict]:
+    # 指定o_subjects_dict时(分片运行)只保留标题与其中某个subject匹配的条目, get_jawiki_text 只会用到这些条目
+    logging.info("开始加载jawiki相关数据")
+    with open("jawiki.json", encoding="utf-8") as file:
+        jawiki: dict = json.load(file)
+    if o_subjects_dict is not None:
+        index = TitleIndex()
+        for subject_id, subject in o_subjects_dict.items():
+            index.add(subject_id, subject["name"])
+        jawiki = {w_id: value for w_id, value in jawiki.items() if any(index.match(title) for title in value["titles"])}
+
+    jawiki_mapping = {}
+    for w_id, value in tqdm(jawiki.items()):
+        w_chars: dict = value.get("char", [])
+        for w_char in w_chars.items():
+            for name in get_jawiki_char_names(w_char[0]):
+                if name not in jawiki_mapping:
+                    jawiki_mapping[name] = []
+                jawiki_mapping[name].append((w_id, w_char[0]))
+    stage.items_in, stage.items_out = len(jawiki), len(jawiki_mapping)
+    return jawiki, jawiki_mapping
+
+
+def iter_jsonl_by_id(path: str) -> Iterator[dict]:
+    # 逐行读取并检查id是否升序, 使输出的character.jsonl也按id排列(delta.py依赖这一点); 不保留已读取的行
+    last_id = None
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            content = json.loads(line)
+            if last_id is not None and content["id"] < last_id:
+                msg = (f"{path}第{line_number}行的id {content['id']} 小于上一行的 {last_id}, "
+                       "流式与分片模式要求输入按id升序排列, 请先按id排序或不使用 --stream/--shard 运行")
+                raise ValueError(msg)
+            last_id = content["id"]
+            yield content
+
+
+def load_contents(stage: Stage) -> list[dict]:
+    logging.info("开始加载character.jsonlines")
+    with open("character.jsonlines", encoding="utf-8") as file:
+        contents = [json.loads(line) for line in file]
+    # 与流式模式相同, 按id处理与输出; 输入未按id排列时只有非流式模式可以处理, 已按id排列时排序几乎没有开销
+    contents.sort(key=lambda content: content["id"])
+    stage.items_out = len(contents)
+    return contents
+
+
+def load_subject_characters(stage: Stage, shard: tuple[int, int] | None = None) -> list[tuple[int, int, int]]:
+    logging.info("开始加载subject-characters.jsonlines")
+    subject_characters = []
+    with open("subject-characters.jsonlines", encoding="utf-8") as file:
+        for line in file:
+            item = json.loads(line)
+            if in_shard(item["character_id"], shard):
+                subject_characters.append((item["character_id"], item["subject_id"], item["type"]))
+    stage.items_out = len(subject_characters)
+    return subject_characters
+
+
+def load_shard_names(stage: Stage, shard: tuple[int, int]) -> set[str]:
+    # 分片中的角色在VNDB中可能查找的所有名称: process_content 中的names均为infobox中的名称、去掉空格后的名称或其简体
+    logging.info("开始收集分片中角色的名称")
+    names: set[str] = set()
+    no_space_names: set[str] = set()
+    with open("character.jsonlines", encoding="utf-8") as file:
+        for line in file:
+            content = json.loads(line)
+            if not in_shard(content["id"], shard):
+                continue
+            info = get_infobox_info(content)
+            for key in LOOKUP_NAME_FIELDS:
+                for name in info[key]:
+                    names.add(name)
+                    no_space_names.add(name.replace(" ", ""))
+    t2s = t2s_converter()
+    t2s.prime(no_space_names)
+    names.update(no_space_names)
+    names.update(t2s.convert(name) for name in no_space_names)
+    t2s.clear()
+    stage.items_out = len(names)
+    return names
+
+
+def load_subjects(stage: Stage, subject_characters: list[tuple[int, int, int]] | None = None) -> dict[int, dict]:
+    # 指定subject_characters时(分片运行)只保留其中出现的subject
+    logging.info("开始加载subject.jsonlines")
+    subject_ids = None if subject_characters is None else {subject_id for _, subject_id, _ in subject_characters}
+    o_subjects_dict = {}
+    with open("subject.jsonlines", encoding="utf-8") as file:
+        for line in file:
+            item = json.loads(line)
+            if subject_ids is None or item["id"] in subject_ids:
+                o_subjects_dict[item["id"]] = {key: item[key] for key in SUBJECT_FIELDS if key in item}
+    stage.items_out = len(o_subjects_dict)
+    return o_subjects_dict
+
+
+def load_tsv_lists(stage: Stage, table: str, value_column: int, keys: Container[str] | None = None) -> dict[str, list]:
+    # 第一列 -> 该列的所有值, 指定keys时只保留第一列在其中的行
+    logging.info(f"开始加载{table}")
+    result: dict[str, list] = {}
+    with open(os.path.join("vndb", "db", table), encoding="utf-8") as file:
+        for line in tqdm(file):
+            info_list = line.split("\t")
+            if keys is not None and info_list[0] not in keys:
+                continue
+            if info_list[0] not in result:
+                result[info_list[0]] = []
+            result[info_list[0]].append(info_list[value_column])
+    stage.items_out = len(result)
+    return result
+
+
+def load_tsv_values(stage: Stage, table: str, value_column: int) -> dict[str, str]:
+    # 第一列 -> 该列的值
+    logging.info(f"开始加载{table}")
+    result: dict[str, str] = {}
+    with open(os.path.join("vndb", "db", table), encoding="utf-8") as file:
+        for line in tqdm(file):
+            info_list = line.split("\t")
+            result[info_list[0]] = info_list[value_column]
+    stage.items_out = len(result)
+    return result
+
+
+def load_char_tsv_lists(stage: Stage, chars_result: tuple, table: str, value_column: int) -> dict[str, list]:
+    # 分片运行时只保留已加载的角色的行
+    chars, _ = chars_result
+    return load_tsv_lists(stage, table, value_column, keys=chars)
+
+
+def load_chars(stage: Stage, names: Container[str] | None = None) -> tuple[dict[str, dict], dict[str, list]]:
+    # 指定names时(分片运行)只保留名称或拉丁名在其中的角色; 被查找的名称对应的角色都会保留, 查找结果不变
+    logging.info("开始加载chars")
+    chars: dict[str, dict] = {}
+    name_chars_mapping: dict[str, list[dict]] = {}
+    # tsv header: id	image	gender	spoil_gender	bloodt	cup_size	main	s_bust	s_waist	s_hip	b_month	b_day	height	weight	main_spoil	age	name	latin	alias	description
+    with open(os.path.join("vndb", "db", "chars"), encoding="utf-8") as file:
+        for line in tqdm(file):
+            info_list = line.split("\t")
+            for index, item in enumerate(info_list):
+                if item in ["\\N", "", "unknown"]:
+                    info_list[index] = None
+            if names is not None and not any(
+                name and (name in names or name.replace(" ", "") in names) for name in (info_list[16], info_list[17])
+            ):
+                continue
+
+            info_dict = {
+                "id": info_list[0],
+                # "image": info_list[1],
+                # "gender": info_list[2],
+                # "spoil_gender": info_list[3],
+                "bloodt": info_list[4],
+                "cup_size": info_list[5],
+                "main": info_list[6],
+                "bust": info_list[7],
+                "waist": info_list[8],
+                "s_hip": info_list[9],
+                "b_month": info_list[10],
+                "b_day": info_list[11],
+                "height": info_list[12],
+                "weight": info_list[13],
+                "age": info_list[15],
+                "name": info_list[16],
+                "latin": info_list[17],
+                "subjects": [],  # 由add_char_subjects填充
+                "traits": {},
+            }
+            chars[info_dict["id"]] = info_dict
+
+            if info_list[16]:
+                if info_list[16] not in name_chars_mapping:
+                    name_chars_mapping[info_list[16]] = []
+                if info_list[16].replace(" ", "") not in name_chars_mapping:
+                    name_chars_mapping[info_list[16].replace(" ", "")] = []
+                name_chars_mapping[info_list[16]].append(info_dict["id"])
+                name_chars_mapping[info_list[16].replace(" ", "")].append(info_dict["id"])
+            if info_list[17]:
+                if info_list[17] not in name_chars_mapping:
+                    name_chars_mapping[info_list[17]] = []
+                name_chars_mapping[info_list[17]].append(info_dict["id"])
+    stage.items_out = len(chars)
+    return chars, name_chars_mapping
+
+
+def add_char_subjects(
+    stage: Stage, chars_result: tuple, chars_vns: dict[str, list], vn_titles: dict[str, list],
+) -> None:
+    chars, _ = chars_result
+    for char_id, char in chars.items():
+        for vn_id in chars_vns.get(char_id, []):
+            if vn_id not in vn_titles:
+                continue
+            char["subjects"].extend(vn_titles[vn_id])
+    stage.items_out = len(chars)
+
+
+def build_subjects_mapping(stage: Stage, subject_characters: list[tuple[int, int, int]], o_subjects_dict: dict) -> dict:
+    logging.info("开始处理subject-characters映射表")
+    subjects_mapping = {}
+    total = stage.items_in = len(subject_characters)
+    # role_type: 角色类型,1为主要角色,2为次要角色
+    for character_id, subject_id, role_type in tqdm(subject_characters, total=total):
+        subject = o_subjects_dict.get(subject_id)
+
+        if subject is None:
+            continue
+        subject_name = subject["name"]
+        subject_zh_name = subject["name_cn"]
+        subject_type: int = subject["type"]
+        if character_id not in subjects_mapping:
+            subjects_mapping[character_id] = []
+        subjects_mapping[character_id].append(
+            {
+                "id": subject_id,
+                "name": subject_name,
+                "zh_name": subject_zh_name,
+                "type": subject_type,
+                "role_type": role_type,
+            },
+        )
+    stage.items_out = len(subjects_mapping)
+    return subjects_mapping
+
+
+def build_crosswalk(stage: Stage, subjects_mapping: dict, o_subjects_dict: dict, vn_titles: dict[str, list]) -> dict:
+    logging.info("开始生成subject与vn的对应表")
+    subject_ids = sorted({subject["id"] for subjects in subjects_mapping.values() for subject in subjects})
+    subject_vns = build_subject_vn_crosswalk((o_subjects_dict[subject_id] for subject_id in subject_ids), vn_titles)
+    stage.items_in, stage.items_out = len(subject_ids), len(subject_vns)
+    return subject_vns
+
+
+def add_traits(
+    stage: Stage, chars_result: tuple, chars_traits: dict[str, list], traits: dict[str, str],
+    traits_parent: dict[str, str],
+) -> None:
+    logging.info("开始处理chars")
+    chars, _ = chars_result
+    total = stage.items_in = len(chars_traits)
+    for char_id, trait_ids in tqdm(chars_traits.items(), total=total):
+        traits_dict = {}
+        for trait_id in trait_ids:
+            # if trait_id not in traits_parents:
+            trait = traits[trait_id][:]
+            parent_list = []
+
+            next_id = trait_id[:]
+            while True:
+                traits_parent_id = traits_parent.get(next_id)
+                if traits_parent_id:
+                    traits_parent_name = traits[traits_parent_id][:]
+                    parent_list.append(traits_parent_name)
+                else:
+                    break
+                next_id = traits_parent_id
+                parent_list.reverse()
+
+            if parent_list[0] not in traits_dict:
+                traits_dict[parent_list[0]] = []
+            traits_dict[parent_list[0]].append(trait)
+
+        chars[char_id]["traits"] = traits_dict
+    stage.items_out = total
+
+
+# 各VNDB表的tsv header:
+# chars_traits: id	tid	spoil	lie
+# traits: id	gid	gorder	defaultspoil	sexual	searchable	applicable	name	alias	description
+# traits_parents: id	parent	main
+# vn_titles: id	lang	official	title	latin
+# chars_vns: id	vid	rid	role	spoil
+LOADERS = (
+    Loader("jp_surnames", load_jp_surnames, inline=True),
+    Loader("jawiki", load_jawiki),
+    Loader("bangumi.character", load_contents),
+    Loader("bangumi.subject_characters", load_subject_characters),
+    Loader("bangumi.subject", load_subjects),
+    Loader("vndb.chars_traits", partial(load_tsv_lists, table="chars_traits", value_column=1)),
+    Loader("vndb.traits", partial(load_tsv_values, table="traits", value_column=7)),
+    Loader("vndb.traits_parents", partial(load_tsv_values, table="traits_parents", value_column=1)),
+    Loader("vndb.vn_titles", partial(load_tsv_lists, table="vn_titles", value_column=3)),
+    Loader("vndb.chars_vns", partial(load_tsv_lists, table="chars_vns", value_column=1)),
+    Loader("vndb.chars", load_chars),
+    Loader("vndb.char_subjects", add_char_subjects, ("vndb.chars", "vndb.chars_vns", "vndb.vn_titles"), inline=True),
+    Loader("subjects_mapping", build_subjects_mapping, ("bangumi.subject_characters", "bangumi.subject"), inline=True),
+    Loader(
+        "subject_vn_crosswalk", build_crosswalk, ("subjects_mapping", "bangumi.subject", "vndb.vn_titles"), inline=True,
+    ),
+    Loader(
+        "traits", add_traits, ("vndb.chars", "vndb.chars_traits", "vndb.traits", "vndb.traits_parents"), inline=True,
+    ),
+)
+
+
+def run_loaders(
+    loaders: list[Loader], run_report: RunReport, workers: int | None = None, processes: bool = False,
+) -> dict[str, object]:
+    # 依赖已就绪的加载器中, 可在其他线程执行的先提交到线程池, 其余在主线程中逐个执行
+    # 线程池中加载的结果直接共享, 不需要复制; processes为True时改用进程池, 结果需要pickle传回主进程
+    # workers为None时由concurrent.futures决定数量, 为0时全部在主线程中按LOADERS的顺序执行
+    results: dict[str, object] = {}
+    pending = {loader.name: loader for loader in loaders}
+    running = {}
+    executor = None
+    if workers != 0:
+        executor = ProcessPoolExecutor(max_workers=workers) if processes else ThreadPoolExecutor(max_workers=workers)
+    try:
+        while pending or running:
+            ready = [loader for loader in pending.values() if all(dep in results for dep in loader.deps)]
+            for loader in ready:
+                if executor is not None and not loader.inline:
+                    running[executor.submit(run_stage, loader.name, loader.func)] = loader.name
+                    del pending[loader.name]
+            inline = [loader for loader in ready if loader.name in pending]
+            if inline:
+                loader = inline[0]
+                with run_report.stage(loader.name) as stage:
+                    results[loader.name] = loader.func(stage, *(results[dep] for dep in loader.deps))
+                del pending[loader.name]
+                continue
+            if not running:
+                msg = f"加载器的依赖无法满足: {', '.join(pending)}"
+                raise RuntimeError(msg)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], record = future.result()
+                run_report.add_record(record)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return results
+
+
+def shard_loader(loader: Loader, shard: tuple[int, int]) -> Loader:
+    # 分片运行时各数据源只加载该分片需要的部分, 依赖分片中数据的加载器改为在主进程中执行
+    if loader.name == "bangumi.subject_characters":
+        return replace(loader, func=partial(loader.func, shard=shard))
+    if loader.name == "bangumi.subject":
+        return replace(loader, deps=("bangumi.subject_characters",), inline=True)
+    if loader.name == "jawiki":
+        return replace(loader, deps=("bangumi.subject",), inline=True)
+    if loader.name == "vndb.chars":
+        return replace(loader, deps=("shard_names",), inline=True)
+    if loader.name in ("vndb.chars_traits", "vndb.chars_vns"):
+        return replace(loader, func=partial(load_char_tsv_lists, **loader.func.keywords), deps=("vndb.chars",), inline=True)
+    return loader
+
+
+def load_data(
+    run_report: RunReport, stream: bool = False, workers: int | None = None, shard: tuple[int, int] | None = None,
+    processes: bool = False,
+) -> BuildData:
+    # 分片运行时角色逐行读取, 其余数据源也只保留该分片的角色可能用到的部分, 处理结果与单机运行相同
+    loaders = [loader for loader in LOADERS if not ((stream or shard) and loader.name == "bangumi.character")]
+    if shard:
+        loaders = [Loader("shard_names", partial(load_shard_names, shard=shard), inline=True)]
+        loaders += [shard_loader(loader, shard) for loader in LOADERS if loader.name != "bangumi.character"]
+    results = run_loaders(loaders, run_report, workers, processes)
+    jawiki, jawiki_mapping = results["jawiki"]
+    chars, name_chars_mapping = results["vndb.chars"]
+    return BuildData(
+        contents=results.get("bangumi.character"),
+        subjects_mapping=results["subjects_mapping"],
+        o_subjects_dict=results["bangumi.subject"],
+        jp_surnames=results["jp_surnames"],
+        name_chars_mapping=name_chars_mapping,
+        chars=chars,
+        jawiki_mapping=jawiki_mapping,
+        jawiki=jawiki,
+        chars_vns=results["vndb.chars_vns"],
+        subject_vns=results["subject_vn_crosswalk"],
+    )
@@ -0,0 +1,110 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 基于字符n-gram的角色名模糊搜索索引
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import chain
+
+NAME_FIELDS = ("zh", "ja", "en", "kana", "nick_name")
+
+# 平假名转片假名, 并去除空格与各类分隔符
+FOLD_TABLE = {code: code + 0x60 for code in range(0x3041, 0x3097)}
+FOLD_TABLE.update({0x309D: 0x30FD, 0x309E: 0x30FE})
+FOLD_TABLE.update({ord(c): None for c in " \t\r\n　・·=゠‎"})
+
+GRAM_SIZE = 2
+PAD_START = "\x02"
+PAD_END = "\x03"
+
+
+def fold(name: str) -> str:
+    # NFKC统一全角/半角形式(半角片假名、全角英数字等)
+    return unicodedata.normalize("NFKC", name).casefold().translate(FOLD_TABLE)
+
+
+def grams(key: str) -> set[str]:
+    padded = PAD_START + key + PAD_END
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+class NameSearchIndex:
+    def __init__(self) -> None:
+        self.keys: list[str] = []  # 折叠后的名称, 下标即key id
+        self.key_ids: dict[str, int] = {}
+        self.gram_counts = array("H")
+        self.entries: list[list[tuple[int, str, str]]] = []  # key id -> [(行号, 字段, 原名)]
+        self.postings: dict[str, array] = {}
+
+    def add(self, name: str, row: int, field: str) -> None:
+        key = fold(name)
+        if not key:
+            return
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.key_ids[key] = key_id
+            self.keys.append(key)
+            self.entries.append([])
+            key_grams = grams(key)
+            self.gram_counts.append(min(len(key_grams), 0xFFFF))
+            for gram in key_grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                posting.append(key_id)
+        entry = (row, field, name)
+        if entry not in self.entries[key_id]:
+            self.entries[key_id].append(entry)
+
+    def add_record(self, row: int, record: dict) -> None:
+        for field in NAME_FIELDS:
+            for name in record.get(field) or []:
+                if name:
+                    self.add(name, row, field)
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> NameSearchIndex:
+        index = cls()
+        with open(path, encoding="utf-8") as file:
+            for row, line in enumerate(file):
+                index.add_record(row, json.loads(line))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.5) -> list[tuple[float, int, str, str]]:
+        # 返回 [(相似度, 行号, 字段, 原名)], 相似度为n-gram集合的Dice系数
+        key = fold(query)
+        if not key:
+            return []
+        query_grams = grams(key)
+        q = len(query_grams)
+        min_score = min(max(min_score, 1e-6), 1.0)
+
+        # 与候选的公共gram数o满足 o >= s*|Q|/(2-s), 公共gram数不足的候选直接剪枝
+        threshold = max(1, math.ceil(min_score * q / (2 - min_score) - 1e-9))
+        # 倒排表合并计数在C层完成, 计数即为与查询的公共gram数
+        overlaps = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query_grams))
+
+        gram_counts = self.gram_counts
+        scored = []
+        for key_id, overlap in overlaps.items():
+            if overlap < threshold:
+                continue
+            score = 2 * overlap / (q + gram_counts[key_id])
+            if score >= min_score:
+                scored.append((score, -abs(len(self.keys[key_id]) - len(key)), key_id))
+
+        results = []
+        for score, _, key_id in heapq.nlargest(k, scored):
+            results.extend((score, row, field, name) for row, field, name in self.entries[key_id])
+            if len(results) >= k:
+                break
+        return results[:k]
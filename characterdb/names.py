@@ -0,0 +1,153 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 名称清理与语言判断
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from characterdb.resources import jp_surnames, s2t_converter, t2s_converter
+
+known_ja_names = ["亜門", "死神様", "宇白順", "九鳳院紫"]
+
+# 字符所属文字类别的位掩码, 各分类函数只读取 script_mask 的结果, 不再各自用正则扫描
+KANA = 1 << 0  # \u3040-\u30FF 平假名与片假名(含・ー)
+CJK = 1 << 1  # \u4E00-\u9FFF 中日统一表意文字
+LATIN = 1 << 2  # 除括号外的ASCII可见字符
+PAREN = 1 << 3  # ()
+FULLWIDTH_PAREN = 1 << 4  # （）
+SPACE = 1 << 5  # str.isspace(), 与正则中的\s相同
+SYMBOL = 1 << 6  # ·↓
+OTHER = 1 << 7
+ENGLISH_MASK = LATIN | PAREN | SPACE | SYMBOL
+ZH_NAME_MASK = CJK | PAREN | FULLWIDTH_PAREN
+SCRIPT_MASK_CACHE_SIZE = 1 << 16
+# 只缓存名称长度的字符串; 简介等长文本几乎不会重复, 放入缓存只会挤掉反复出现的名称并让长文本常驻内存
+SCRIPT_MASK_CACHE_MAX_LENGTH = 64
+KANA_RE = re.compile(r"[\u3040-\u30FF]")
+
+
+def char_script(char: str) -> int:
+    code = ord(char)
+    if 0x3040 <= code <= 0x30FF:  # noqa: PLR2004
+        return KANA
+    if 0x4E00 <= code <= 0x9FFF:  # noqa: PLR2004
+        return CJK
+    if char in "()":
+        return PAREN
+    if 0x21 <= code <= 0x7E:  # noqa: PLR2004
+        return LATIN
+    if char in "（）":  # noqa: RUF001
+        return FULLWIDTH_PAREN
+    if char.isspace():
+        return SPACE
+    if char in "·↓":
+        return SYMBOL
+    return OTHER
+
+
+def scan_script_mask(text: str) -> int:
+    mask = 0
+    for char in set(text):
+        mask |= char_script(char)
+    return mask
+
+
+cached_script_mask = lru_cache(maxsize=SCRIPT_MASK_CACHE_SIZE)(scan_script_mask)
+
+
+def script_mask(text: str) -> int:
+    # 同一名称会被多个分类函数反复判断, 每个不同的名称只扫描一次
+    if len(text) > SCRIPT_MASK_CACHE_MAX_LENGTH:
+        return scan_script_mask(text)
+    return cached_script_mask(text)
+
+
+def get_jawiki_char_names(char_name: str) -> list[str]:
+    result = []
+    spilt_brackets = re.findall(r"\((.*?)\)", char_name)
+    spilt_brackets += re.findall(r"（(.*?)）", char_name)
+    no_brackets_names = re.split(r"\(.*?\)|（.*?）", char_name)
+    for bracket in spilt_brackets:
+        if re.findall(r"通称|版|,|-|\d\d\d\d|#", bracket):
+            continue
+        result.append(bracket)
+    for name in no_brackets_names:
+        if "#" in name:
+            continue
+        ja_en = re.findall(r"([\u3040-\u309F\u30A0-\u30FF・])+\s+([a-zA-Z ]+)", name.strip())
+        if ja_en:
+            for item in ja_en:
+                result.extend(item)
+        result.append(name)
+    return list(dict.fromkeys(result))
+
+
+def clear(content: str) -> str:
+    content = content.replace("\t", "")
+    content = content.replace("\n", "")
+    content = content.replace("\r", "")
+    content = content.replace("‎", "")
+    content = content.replace("\u3000", "")
+    content = re.sub(r"^ +| +$", "", content)
+    return re.sub(r"[（(\[【［][^)）】\]］]*[】］\])）]", "", content)
+
+
+def is_english_with_symbols(text: str) -> bool:
+    # 只含英文字母、数字、空格和常见符号(原正则中的 \)-_ 为范围, 实际包含全部ASCII可见字符)
+    return not script_mask(text) & ~ENGLISH_MASK
+
+
+def normalize_subject_name(name: str) -> str:
+    name = clear(name.replace(" ", ""))
+    name = name.replace("*", "＊")  # 千恋＊万花  # noqa: RUF003
+    name = name.replace("「", "")
+    return name.replace("」", "")
+
+
+def subject_name_compare(name1: str, name2: str) -> bool:
+    name1 = normalize_subject_name(name1)
+    name2 = normalize_subject_name(name2)
+    if name1 == name2:
+        return True
+    if len(name1) > 4 and len(name2) > 4 and name1[:4] == name2[:4]:
+        return True
+    return False
+
+
+def is_japanese(text: str) -> bool:
+    # 含有假名或汉字
+    return bool(script_mask(text) & (KANA | CJK))
+
+
+def include_japanese(text: str) -> bool:
+    return bool(script_mask(text) & KANA)
+
+
+def text_includes_kana(text: str) -> bool:
+    # 与 include_japanese 相同, 用于简介等长文本: 不经过缓存, 找到第一个假名即返回
+    return KANA_RE.search(text) is not None
+
+
+def is_jp_name(text: str) -> bool:
+    if is_english_with_symbols(text):
+        return False
+    if include_japanese(text):
+        return True
+    if is_japanese(text) and s2t_converter().convert(text) == text and len(text) > 3:
+        return True
+    if text in known_ja_names:
+        return True
+    return any(text.startswith(jp_surname) for jp_surname in jp_surnames())
+
+
+def is_zh_name(text: str) -> bool:
+    text = text.strip()
+    if " " in text:
+        return False
+    # 只含汉字与括号
+    if not text or script_mask(text) & ~ZH_NAME_MASK:
+        return False
+    if t2s_converter().convert(text) != text:
+        return False
+    return True
@@ -0,0 +1,136 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 规范化输出: 角色记录中重复出现的subject、VNDB作品标题与特征名放到单独的表中, 记录里只保存编号
+from __future__ import annotations
+
+import json
+import os
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+NORMALIZED_DIR = "normalized"
+# subjects表中保存的字段, 其余字段(role_type)因角色而异, 留在记录中
+SUBJECT_FIELDS = ("name", "zh_name", "type")
+
+
+class StringTable:
+    # 字符串 -> 编号, 按第一次出现的顺序编号
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+
+    def id(self, value: str) -> int:
+        return self.ids.setdefault(value, len(self.ids))
+
+    def to_list(self) -> list[str]:
+        return list(self.ids)
+
+
+class NormalizedWriter:
+    # 角色记录:
+    #   subjects: [{"id": subject id, "role_type": ...}], 其余字段见 subjects.json
+    #   info.subjects: titles.json 中的编号
+    #   info.traits: [[分类的编号, [特征的编号, ...]], ...], 名称见 traits.json
+    def __init__(self, directory: str = NORMALIZED_DIR) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.subjects: dict[int, dict] = {}
+        self.titles = StringTable()
+        self.traits = StringTable()
+        self.file = open(os.path.join(directory, "character.jsonl"), "w", encoding="utf-8")  # noqa: SIM115
+
+    def normalize(self, record: dict) -> dict:
+        record = record.copy()
+        subjects = []
+        for subject in record["subjects"]:
+            if subject["id"] not in self.subjects:
+                self.subjects[subject["id"]] = {key: subject[key] for key in SUBJECT_FIELDS}
+            subjects.append({"id": subject["id"], "role_type": subject["role_type"]})
+        record["subjects"] = subjects
+        if record["info"]:
+            info = record["info"] = record["info"].copy()
+            info["subjects"] = [self.titles.id(title) for title in info["subjects"]]
+            info["traits"] = [
+                [self.traits.id(group), [self.traits.id(trait) for trait in traits]]
+                for group, traits in info["traits"].items()
+            ]
+        return record
+
+    def write(self, record: dict) -> None:
+        self.file.write(json.dumps(self.normalize(record), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+        for name, table in (
+            ("subjects.json", self.subjects), ("titles.json", self.titles.to_list()), ("traits.json", self.traits.to_list()),
+        ):
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as file:
+                json.dump(table, file, ensure_ascii=False)
+
+
+def write_normalized(records: Iterable[dict], directory: str = NORMALIZED_DIR) -> int:
+    writer = NormalizedWriter(directory)
+    count = 0
+    try:
+        for record in records:
+            writer.write(record)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+class NormalizedReader:
+    # 逐行读取规范化的记录; 各表在第一次需要时才加载, 记录只在调用对应方法时与表关联
+    def __init__(self, directory: str = NORMALIZED_DIR) -> None:
+        self.directory = directory
+
+    def _load(self, name: str) -> object:
+        with open(os.path.join(self.directory, name), encoding="utf-8") as file:
+            return json.load(file)
+
+    @cached_property
+    def subject_table(self) -> dict[int, dict]:
+        return {int(subject_id): subject for subject_id, subject in self._load("subjects.json").items()}
+
+    @cached_property
+    def title_table(self) -> list[str]:
+        return self._load("titles.json")
+
+    @cached_property
+    def trait_table(self) -> list[str]:
+        return self._load("traits.json")
+
+    def __iter__(self) -> Iterator[dict]:
+        with open(os.path.join(self.directory, "character.jsonl"), encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+    def subjects(self, record: dict) -> list[dict]:
+        return [
+            {"id": subject["id"], **self.subject_table[subject["id"]], "role_type": subject["role_type"]}
+            for subject in record["subjects"]
+        ]
+
+    def vn_titles(self, record: dict) -> list[str]:
+        # 对应完整记录中的 info.subjects
+        return [self.title_table[title_id] for title_id in record["info"]["subjects"]] if record["info"] else []
+
+    def traits(self, record: dict) -> dict[str, list[str]]:
+        if not record["info"]:
+            return {}
+        return {
+            self.trait_table[group]: [self.trait_table[trait] for trait in traits] for group, traits in record["info"]["traits"]
+        }
+
+    def denormalize(self, record: dict) -> dict:
+        # 还原为与 character.jsonl 中相同的记录
+        record = record.copy()
+        if record["info"]:
+            info = record["info"] = record["info"].copy()
+            info["subjects"] = self.vn_titles(record)
+            info["traits"] = self.traits(record)
+        record["subjects"] = self.subjects(record)
+        return record
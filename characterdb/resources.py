@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 耗时的资源(OpenCC转换器、Janome词典、姓氏表)在第一次使用时创建并缓存, 导入时不会加载
+from __future__ import annotations
+
+import json
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from janome.tokenizer import Tokenizer
+
+OPENCC_BATCH_SIZE = 5000  # 每次调用OpenCC转换的文本数量
+JP_SURNAMES_PATH = "jp_surnames.json"
+
+
+class OpenCCTable:
+    # 将大量短文本以换行拼接后批量转换, 结果保存在查找表中供名称判断函数读取
+    def __init__(self, config: str) -> None:
+        import opencc  # noqa: PLC0415
+
+        self.converter = opencc.OpenCC(config)
+        self.table: dict[str, str] = {}
+
+    def prime(self, texts: Iterable[str]) -> None:
+        pending = [text for text in dict.fromkeys(texts) if text not in self.table and "\n" not in text]
+        for i in range(0, len(pending), OPENCC_BATCH_SIZE):
+            batch = pending[i:i + OPENCC_BATCH_SIZE]
+            converted = self.converter.convert("\n".join(batch)).split("\n")
+            if len(converted) != len(batch):
+                converted = [self.converter.convert(text) for text in batch]
+            self.table.update(zip(batch, converted, strict=True))
+
+    def convert(self, text: str) -> str:
+        converted = self.table.get(text)
+        if converted is None:
+            converted = self.table[text] = self.converter.convert(text)
+        return converted
+
+    def clear(self) -> None:
+        self.table.clear()
+
+
+@cache
+def s2t_converter() -> OpenCCTable:
+    return OpenCCTable("s2t.json")
+
+
+@cache
+def t2s_converter() -> OpenCCTable:
+    return OpenCCTable("t2s.json")
+
+
+@cache
+def tokenizer() -> Tokenizer:
+    # 导入janome与加载词典都需要较长时间
+    from janome.tokenizer import Tokenizer  # noqa: PLC0415
+
+    return Tokenizer()
+
+
+@cache
+def jp_surnames(path: str = JP_SURNAMES_PATH) -> list[str]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
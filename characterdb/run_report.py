@@ -0,0 +1,226 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 记录各阶段的耗时、CPU时间、峰值内存与处理数量, 并输出可对比的运行报告
+from __future__ import annotations
+
+import argparse
+import cProfile
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import pstats
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+REPORT_VERSION = 1
+PROFILE_TOP = 30  # 摘要中每个阶段列出的函数数量
+
+
+def _peak_rss_mb() -> float:
+    # Linux下ru_maxrss单位为KB, macOS下为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb() -> float | None:
+    # 当前的RSS, 读取/proc, 不支持的平台返回None
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cpu_s() -> float:
+    # 包含已结束的子进程(如进程池)的CPU时间
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class Stage:
+    def __init__(self, name: str, items_in: int | None = None) -> None:
+        self.name = name
+        self.items_in = items_in
+        self.items_out: int | None = None
+        # 阶段内的其他计数, 如跳过的条目数量
+        self.counters: dict[str, int] = {}
+
+    def to_dict(self, wall: float, cpu: float, peak_before: float, peak_after: float) -> dict:
+        items = self.items_out if self.items_in is None else self.items_in
+        return {
+            "name": self.name,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": round(peak_after, 1),
+            "peak_rss_delta_mb": round(peak_after - peak_before, 1),
+            "rss_mb": None if (rss := rss_mb()) is None else round(rss, 1),
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "items_per_s": round(items / wall, 1) if items is not None and wall > 0 else None,
+            **({"counters": self.counters} if self.counters else {}),
+        }
+
+
+def run_stage(name: str, func: Callable[[Stage], object]) -> tuple[object, dict]:
+    # 在线程池或子进程中执行一个阶段, 返回结果与阶段记录, 由主线程通过 RunReport.add_record 汇总
+    # CPU时间只统计执行该阶段的线程; 在线程池中执行时峰值内存为整个进程的, 包含同时执行的其他阶段
+    stage = Stage(name)
+    peak_before = _peak_rss_mb()
+    start_cpu = time.thread_time()
+    start = time.perf_counter()
+    result = func(stage)
+    cpu = time.thread_time() - start_cpu
+    return result, stage.to_dict(time.perf_counter() - start, cpu, peak_before, _peak_rss_mb())
+
+
+class RunReport:
+    def __init__(self, script: str, path: str | None = None, profile_dir: str | None = None) -> None:
+        self.script = script
+        self.path = path or f"run_report_{script}.json"
+        self.profile_dir = profile_dir
+        self.stages: list[dict] = []
+        self._stack: list[str] = []
+        self._profilers: list[cProfile.Profile] = []
+        self._profile_summaries: list[str] = []
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        self._started_at = datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds")
+        self._start_wall = time.perf_counter()
+        self._start_cpu = _cpu_s()
+
+    @contextmanager
+    def stage(self, name: str, items_in: int | None = None) -> Iterator[Stage]:
+        # 嵌套的阶段以"."连接父阶段名, 如 load_data.vndb.chars
+        full_name = ".".join([*self._stack, name])
+        stage = Stage(full_name, items_in)
+        self._stack.append(name)
+        if self.profile_dir:
+            self._start_profile()
+        peak_before = _peak_rss_mb()
+        start_cpu = _cpu_s()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            wall = time.perf_counter() - start
+            record = stage.to_dict(wall, _cpu_s() - start_cpu, peak_before, _peak_rss_mb())
+            if self.profile_dir:
+                record["profile"] = self._stop_profile(full_name)
+            self._stack.pop()
+            self.stages.append(record)
+            logging.info(
+                f"[阶段] {full_name}: {record['wall_s']:.2f}s, CPU {record['cpu_s']:.2f}s, "
+                f"峰值内存 {record['peak_rss_mb']:.1f}MB (+{record['peak_rss_delta_mb']:.1f}MB)"
+                + (f", 数量 {record['items_in']}→{record['items_out']}" if record["items_in"] is not None else "")
+                + (f", {record['items_per_s']:.1f}/s" if record["items_per_s"] is not None else ""),
+            )
+
+    def add_record(self, record: dict) -> None:
+        # 在其他线程或进程中完成的阶段, 作为当前阶段的子阶段记录
+        record["name"] = ".".join([*self._stack, record["name"]])
+        self.stages.append(record)
+
+    def _start_profile(self) -> None:
+        # 同一时间只能有一个profiler生效: 进入子阶段时暂停父阶段的profiler, 因此父阶段的profile不包含子阶段
+        if self._profilers:
+            self._profilers[-1].disable()
+        profiler = cProfile.Profile()
+        self._profilers.append(profiler)
+        profiler.enable()
+
+    def _stop_profile(self, full_name: str) -> str:
+        profiler = self._profilers.pop()
+        profiler.disable()
+        if self._profilers:
+            self._profilers[-1].enable()
+        path = os.path.join(self.profile_dir, f"{self.script}.{full_name}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        self._profile_summaries.append(f"==== {full_name} ====\n{summary.getvalue().strip()}\n")
+        return path
+
+    def to_dict(self) -> dict:
+        return {
+            "version": REPORT_VERSION,
+            "script": self.script,
+            "started_at": self._started_at,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "total": {
+                "wall_s": round(time.perf_counter() - self._start_wall, 4),
+                "cpu_s": round(_cpu_s() - self._start_cpu, 4),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            },
+            "stages": self.stages,
+        }
+
+    def save(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+        logging.info(f"运行报告已保存到{self.path}")
+        if self.profile_dir:
+            summary_path = os.path.join(self.profile_dir, f"{self.script}.summary.txt")
+            with open(summary_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(self._profile_summaries))
+            logging.info(f"各阶段的profile已保存到{self.profile_dir}, 摘要见{summary_path}")
+
+
+def load_stages(path: str) -> tuple[dict, dict[str, dict]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report, {stage["name"]: stage for stage in report["stages"]}
+
+
+def compare(old_path: str, new_path: str, threshold: float, min_seconds: float) -> list[str]:
+    old_report, old_stages = load_stages(old_path)
+    new_report, new_stages = load_stages(new_path)
+    old_stages["(total)"] = {"name": "(total)", **old_report["total"]}
+    new_stages["(total)"] = {"name": "(total)", **new_report["total"]}
+
+    regressions = []
+    print(f"{'stage':<40}{'old(s)':>10}{'new(s)':>10}{'ratio':>8}{'old RSS':>10}{'new RSS':>10}{'old/s':>10}{'new/s':>10}")
+    for name in [*new_stages, *(n for n in old_stages if n not in new_stages)]:
+        old, new = old_stages.get(name), new_stages.get(name)
+        if old is None or new is None:
+            print(f"{name:<40}{'-' if old is None else old['wall_s']:>10}{'-' if new is None else new['wall_s']:>10}")
+            continue
+        ratio = new["wall_s"] / old["wall_s"] if old["wall_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold and new["wall_s"] - old["wall_s"] >= min_seconds:
+            flag = "  <-- 变慢"
+            regressions.append(name)
+        print(
+            f"{name:<40}{old['wall_s']:>10.2f}{new['wall_s']:>10.2f}{ratio:>8.2f}"
+            f"{old['peak_rss_mb']:>9.0f}M{new['peak_rss_mb']:>9.0f}M"
+            f"{old.get('items_per_s') or '-':>10}{new.get('items_per_s') or '-':>10}{flag}",
+        )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="对比两次运行报告")
+    compare_parser.add_argument("old", type=str)
+    compare_parser.add_argument("new", type=str)
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例视为变慢")
+    compare_parser.add_argument("--min-seconds", type=float, default=1.0, help="忽略增加量小于该秒数的阶段")
+    compare_parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    regressions = compare(args.old, args.new, args.threshold, args.min_seconds)
+    if regressions:
+        logging.warning(f"以下阶段变慢: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
@@ -0,0 +1,251 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from characterdb.name_search import NameSearchIndex
+
+NAME_FIELDS = ("zh", "ja", "en", "kana", "nick_name")
+MAX_BATCH_SIZE = 1000
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class CharacterIndex:
+    def __init__(self, records: list[dict]) -> None:
+        self.records = records
+        self.by_id: dict[str, int] = {}
+        self.by_name: dict[str, list[int]] = {}
+        self.by_subject: dict[str, list[int]] = {}
+        self.search_index = NameSearchIndex()
+        for row, record in enumerate(records):
+            self.by_id[str(record["id"])] = row
+            self.search_index.add_record(row, record)
+            names = set()
+            for field in NAME_FIELDS:
+                for name in record.get(field) or []:
+                    if not name:
+                        continue
+                    names.add(name)
+                    # 与p.py一致, 额外收录去除空格的形式
+                    names.add(name.replace(" ", ""))
+            for name in names:
+                self.by_name.setdefault(name, []).append(row)
+            for subject in record.get("subjects") or []:
+                self.by_subject.setdefault(str(subject["id"]), []).append(row)
+
+    @classmethod
+    def load(cls, path: str) -> CharacterIndex:
+        with open(path, encoding="utf-8") as file:
+            return cls([json.loads(line) for line in file if line.strip()])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_id(self, char_id: str) -> dict | None:
+        row = self.by_id.get(char_id)
+        return None if row is None else self.records[row]
+
+    def get_name(self, name: str) -> list[dict]:
+        name = name.strip()
+        rows = self.by_name.get(name)
+        if rows is None:
+            rows = self.by_name.get(name.replace(" ", ""), [])
+        return [self.records[row] for row in rows]
+
+    def get_subject(self, subject_id: str) -> list[dict]:
+        return [self.records[row] for row in self.by_subject.get(subject_id, [])]
+
+    def search(self, query: str, k: int, min_score: float) -> list[dict]:
+        return [
+            {"score": round(score, 4), "field": field, "name": name, "character": self.records[row]}
+            for score, row, field, name in self.search_index.search(query, k, min_score)
+        ]
+
+
+class IndexHolder:
+    # 持有当前索引, 发现新的发布文件后在线程池中重建索引并原子替换
+    def __init__(self, path: str, poll_interval: float) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.index = CharacterIndex([])
+        self.signature: tuple[int, int] | None = None
+
+    def _file_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def reload_if_changed(self) -> bool:
+        signature = self._file_signature()
+        if signature is None or signature == self.signature:
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            index = await loop.run_in_executor(None, CharacterIndex.load, self.path)
+        except (OSError, ValueError):
+            logging.exception(f"加载{self.path}失败, 继续使用旧索引")
+            return False
+        # 文件在加载期间仍在写入时等待下一轮
+        if self._file_signature() != signature:
+            return False
+        self.index = index
+        self.signature = signature
+        logging.info(f"已加载{self.path}, 共{len(index)}个角色")
+        return True
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload_if_changed()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+def handle_request(holder: IndexHolder, method: str, target: str, body: bytes) -> tuple[int, object]:
+    url = urlsplit(target)
+    parts = [unquote(part) for part in url.path.split("/") if part]
+    query = parse_qs(url.query)
+    index = holder.index
+
+    if not parts:
+        return 200, {"characters": len(index)}
+
+    match parts[0]:
+        case "name":
+            if method != "GET":
+                raise HTTPError(405, "只支持GET")
+            if len(parts) == 2:
+                name = parts[1]
+            elif "q" in query:
+                name = query["q"][0]
+            else:
+                raise HTTPError(400, "缺少名称")
+            return 200, {"name": name, "results": index.get_name(name)}
+        case "id":
+            if method != "GET" or len(parts) != 2:
+                raise HTTPError(405 if method != "GET" else 400, "用法: GET /id/<角色id>")
+            record = index.get_id(parts[1])
+            if record is None:
+                raise HTTPError(404, f"角色{parts[1]}不存在")
+            return 200, record
+        case "subject":
+            if method != "GET" or len(parts) != 2:
+                raise HTTPError(405 if method != "GET" else 400, "用法: GET /subject/<作品id>")
+            return 200, {"subject": parts[1], "results": index.get_subject(parts[1])}
+        case "search":
+            if method != "GET":
+                raise HTTPError(405, "只支持GET")
+            if "q" not in query:
+                raise HTTPError(400, "缺少参数q")
+            try:
+                k = min(int(query.get("k", ["10"])[0]), MAX_BATCH_SIZE)
+                min_score = float(query.get("min_score", ["0.5"])[0])
+            except ValueError as e:
+                raise HTTPError(400, "k或min_score无效") from e
+            return 200, {"query": query["q"][0], "results": index.search(query["q"][0], k, min_score)}
+        case "batch":
+            if method != "POST":
+                raise HTTPError(405, "只支持POST")
+            try:
+                payload = json.loads(body)
+            except ValueError as e:
+                raise HTTPError(400, "请求体不是有效的json") from e
+            names = payload.get("names") if isinstance(payload, dict) else payload
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise HTTPError(400, "names必须是字符串列表")
+            if len(names) > MAX_BATCH_SIZE:
+                raise HTTPError(413, f"一次最多查询{MAX_BATCH_SIZE}个名称")
+            return 200, {"results": {name: index.get_name(name) for name in names}}
+    raise HTTPError(404, "未知的路径")
+
+
+async def handle_connection(holder: IndexHolder, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            try:
+                method, target, version = request_line.decode("utf-8", "replace").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            try:
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    keep_alive = False
+                    raise HTTPError(413, "请求体过大")
+                body = await reader.readexactly(length) if length else b""
+                status, result = handle_request(holder, method, target, body)
+            except HTTPError as e:
+                status, result = e.status, {"error": e.message}
+            except ValueError:
+                status, result = 400, {"error": "无效的请求"}
+                keep_alive = False
+
+            data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1") + data,
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(path: str, host: str, port: int, poll_interval: float) -> None:
+    holder = IndexHolder(path, poll_interval)
+    await holder.reload_if_changed()
+    if holder.signature is None:
+        logging.warning(f"{path}不存在, 等待发布文件出现")
+    watcher = asyncio.create_task(holder.watch())
+    server = await asyncio.start_server(lambda r, w: handle_connection(holder, r, w), host, port)
+    logging.info(f"开始监听 http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=str, default="character.jsonl", help="p.py生成的character.jsonl")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="检查发布文件更新的间隔(秒)")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.data, args.host, args.port, args.poll_interval))
@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 分片运行: 按角色id的哈希将bangumi角色分到N个分片, 各分片单独处理后再合并为与单机运行相同的结果
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import logging
+import os
+import re
+import zlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+SHARD_DIR = "shards"
+SHARD_NAME_RE = re.compile(r"shard-(\d+)-of-(\d+)")
+# 各分片中相加即可得到总数的统计
+REPORT_COUNTS = ("content_total", "vndb_match_count", "tags_match_count", "no_zh_count", "no_ja_count")
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    match = re.fullmatch(r"(\d+)/(\d+)", text)
+    if not match or not 0 <= int(match[1]) < int(match[2]):
+        msg = f"分片应为 i/N 且 0 <= i < N: {text}"
+        raise argparse.ArgumentTypeError(msg)
+    return int(match[1]), int(match[2])
+
+
+def shard_of(character_id: int, count: int) -> int:
+    # crc32不受PYTHONHASHSEED影响, 不同机器上的划分相同
+    return zlib.crc32(str(character_id).encode("utf-8")) % count
+
+
+def in_shard(character_id: int, shard: tuple[int, int] | None) -> bool:
+    return shard is None or shard_of(character_id, shard[1]) == shard[0]
+
+
+def shard_path(directory: str, shard: tuple[int, int]) -> str:
+    return os.path.join(directory, f"shard-{shard[0]}-of-{shard[1]}")
+
+
+def iter_shard_contents(contents: Iterable[dict], shard: tuple[int, int]) -> Iterator[dict]:
+    # contents按id升序, 各分片的结果因此也按id升序, 合并时按id归并
+    return (content for content in contents if in_shard(content["id"], shard))
+
+
+def iter_shard_results(path: str) -> Iterator[tuple[dict, list[str]]]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            item = json.loads(line)
+            yield item["result"], item["maybe_ja_names"]
+
+
+def find_shards(directory: str) -> list[str]:
+    # 检查分片是否齐全, 返回按序号排列的分片目录
+    shards: dict[int, set[int]] = {}
+    for name in os.listdir(directory):
+        match = SHARD_NAME_RE.fullmatch(name)
+        if match:
+            shards.setdefault(int(match[2]), set()).add(int(match[1]))
+    if len(shards) != 1:
+        msg = f"{directory}中应只有一种分片数量的结果, 实际为: {sorted(shards) or '无'}"
+        raise ValueError(msg)
+    count, indexes = next(iter(shards.items()))
+    missing = sorted(set(range(count)) - indexes)
+    if missing:
+        msg = f"缺少分片: {', '.join(f'{i}/{count}' for i in missing)}"
+        raise ValueError(msg)
+    return [shard_path(directory, (i, count)) for i in range(count)]
+
+
+def merge_results(paths: Iterable[str]) -> Iterator[tuple[dict, list[str]]]:
+    # 各分片的结果均按id递增, 归并后即为单机运行时的顺序
+    yield from heapq.merge(*(iter_shard_results(path) for path in paths), key=lambda item: item[0]["id"])
+
+
+def merge(
+    directory: str, normalized: str | None = None, columnar: str | None = None, trait_index: str | None = None,
+) -> None:
+    # 需要在输出目录中运行, 写出与单机运行相同的 character.jsonl/json、maybe_ja_names.txt、report.json 与 subject_vn_crosswalk.json
+    from characterdb.build import iter_jsonl, write_json_array  # noqa: PLC0415
+    from characterdb.columnar import write_columnar  # noqa: PLC0415
+    from characterdb.normalized import write_normalized  # noqa: PLC0415
+    from characterdb.trait_index import build_trait_index  # noqa: PLC0415
+
+    shard_dirs = find_shards(directory)
+    logging.info(f"开始合并{len(shard_dirs)}个分片")
+
+    report = dict.fromkeys(REPORT_COUNTS, 0)
+    crosswalk: dict[int, list[str]] = {}
+    for shard_dir in shard_dirs:
+        with open(os.path.join(shard_dir, "report.json"), encoding="utf-8") as file:
+            shard_report = json.load(file)
+        for key in REPORT_COUNTS:
+            report[key] += shard_report[key]
+        with open(os.path.join(shard_dir, "subject_vn_crosswalk.json"), encoding="utf-8") as file:
+            crosswalk.update((int(subject_id), vn_ids) for subject_id, vn_ids in json.load(file).items())
+
+    results_count = 0
+    with open("character.jsonl", "w", encoding="utf-8") as character_file, \
+            open("maybe_ja_names.jsonl.part", "w", encoding="utf-8") as maybe_ja_names_file:
+        for result, maybe_ja_names in merge_results(os.path.join(shard_dir, "characters.jsonl") for shard_dir in shard_dirs):
+            character_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            results_count += 1
+            for maybe_ja_name in maybe_ja_names:
+                maybe_ja_names_file.write(json.dumps(maybe_ja_name, ensure_ascii=False) + "\n")
+    if results_count != report["content_total"]:
+        msg = f"分片中的角色数量({results_count})与report.json中的数量({report['content_total']})不一致"
+        raise ValueError(msg)
+
+    with open("report.json", "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=4)
+    with open("subject_vn_crosswalk.json", "w", encoding="utf-8") as file:
+        json.dump(dict(sorted(crosswalk.items())), file, ensure_ascii=False, indent=4)
+    write_json_array("maybe_ja_names.txt", iter_jsonl("maybe_ja_names.jsonl.part"))
+    os.remove("maybe_ja_names.jsonl.part")
+    write_json_array("character.json", iter_jsonl("character.jsonl"))
+    if normalized:
+        write_normalized(iter_jsonl("character.jsonl"), normalized)
+    if columnar:
+        write_columnar(iter_jsonl("character.jsonl"), columnar)
+    if trait_index:
+        # 需要当前目录下的vndb/db
+        build_trait_index(iter_jsonl("character.jsonl"), trait_index)
+    logging.info(f"合并完成, 角色数量: {results_count}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shard-dir", type=str, default=SHARD_DIR, help="p.py --shard 输出的分片目录")
+    parser.add_argument("--normalized", type=str, nargs="?", const="normalized", default=None, metavar="DIR",
+                        help="另外输出规范化的结果, 默认输出到normalized")
+    parser.add_argument("--columnar", type=str, nargs="?", const="character_numeric.npz", default=None, metavar="PATH",
+                        help="另外将VNDB数值字段导出为列式的.npz, 默认输出到character_numeric.npz")
+    parser.add_argument("--trait-index", type=str, nargs="?", const="trait_index.json", default=None, metavar="PATH",
+                        help="另外输出VNDB特征的位图索引, 需要当前目录下的vndb/db, 默认输出到trait_index.json")
+    args = parser.parse_args(argv)
+
+    merge(args.shard_dir, args.normalized, args.columnar, args.trait_index)
@@ -0,0 +1,169 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0"
+URL = "https://myoji-yurai.net/prefectureRanking.htm"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class BadPageError(Exception):
+    # 状态码为200但内容不是排行页面(错误页、验证码、页面结构变化), 视为可重试的错误且不写入缓存
+    pass
+
+
+class RateLimiter:
+    # 所有线程共享, 保证相邻两次请求的开始时间至少间隔 1/rate 秒
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SurnameScraper:
+    def __init__(self, url: str, workers: int, rate: float, retries: int, backoff: float, cache_dir: str) -> None:
+        self.url = url
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        # 缓存按地址分目录, 指向测试服务器与真实站点的运行不会共用缓存
+        self.cache_dir = os.path.join(cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:16])
+        self.limiter = RateLimiter(rate)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = UA
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def read_cache(self, cache_path: str) -> list | None:
+        if not os.path.exists(cache_path):
+            return None
+        with open(cache_path, encoding="utf-8") as f:
+            html = f.read()
+        try:
+            return parse_surnames(html)
+        except BadPageError:
+            logging.warning(f"缓存{cache_path}不是有效的排行页面, 重新获取")
+            os.remove(cache_path)
+            return None
+
+    def get_surnames(self, page: int) -> list:
+        cache_path = os.path.join(self.cache_dir, f"{page}.html")
+        surnames = self.read_cache(cache_path)
+        if surnames is not None:
+            return surnames
+
+        logging.info(f"Getting surnames from page {page}")
+        params = {
+            "prefecture": "全国",
+            "page": page,
+        }
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                response = self.session.get(self.url, params=params, timeout=10)
+                response.raise_for_status()
+                # 先解析再写入缓存, 无效的页面不会被缓存
+                surnames = parse_surnames(response.text)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError, BadPageError) as e:
+                # 404等其他状态码不重试
+                retryable = not isinstance(e, requests.HTTPError) or e.response.status_code in RETRY_STATUS
+                if attempt == self.retries or not retryable:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random())  # noqa: S311
+                logging.warning(f"获取第{page}页失败({e}), {delay:.1f}秒后重试")
+                time.sleep(delay)
+                continue
+            break
+
+        # 先写入临时文件再替换, 避免中断时留下不完整的缓存
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        os.replace(tmp_path, cache_path)
+        return surnames
+
+    def run(self, pages: int) -> list:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        results: dict[int, list] = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.get_surnames, page): page for page in range(pages)}
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    results[page] = future.result()
+                except Exception:
+                    logging.exception(f"获取第{page}页失败")
+                    failed.append(page)
+        if failed:
+            msg = f"{len(failed)}页获取失败: {sorted(failed)}, 已获取的页面缓存在{self.cache_dir}, 重新运行即可继续"
+            raise RuntimeError(msg)
+
+        surname_list = []
+        for page in range(pages):
+            surname_list.extend(results[page])
+        return surname_list
+
+
+def parse_surnames(html: str) -> list:
+    surnames = []
+    soup = BeautifulSoup(html, "html.parser")
+    content: BeautifulSoup = soup.find("div", {"id": "content"})
+    if content is None:
+        msg = "页面中没有#content"
+        raise BadPageError(msg)
+    for table in content.find_all("table", {'class': 'simple'}):
+        thead = table.find("thead")
+        if thead is None or thead.text != "\n\n順位\n名字\n人数":
+            continue
+
+        for tr in table.find_all("tr", {'class': 'odd'}):
+            for a in tr.find_all("a"):
+                surnames.append(a.text)
+    if not surnames:
+        msg = "页面中没有名字排行"
+        raise BadPageError(msg)
+    return surnames
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default=URL, help="排行页面地址, 测试时可指向本地服务器")
+    parser.add_argument("--pages", type=int, default=80)
+    parser.add_argument("--workers", type=int, default=4, help="并发请求数")
+    parser.add_argument("--rate", type=float, default=1.0, help="每秒最多发起的请求数")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--backoff", type=float, default=2.0, help="第一次重试前等待的秒数, 之后指数增长")
+    parser.add_argument("--cache-dir", type=str, default="surname_cache", help="已获取页面的缓存目录")
+    parser.add_argument("--output", type=str, default="jp_surnames.json")
+    args = parser.parse_args(argv)
+
+    scraper = SurnameScraper(args.url, args.workers, args.rate, args.retries, args.backoff, args.cache_dir)
+    surname_list = scraper.run(args.pages)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(surname_list, f, ensure_ascii=False, indent=4)
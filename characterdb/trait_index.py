@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# VNDB特征的位图索引: 每个特征一个位图, 第n位表示 character.jsonl 第n行的角色具有该特征或其任一子孙特征
+from __future__ import annotations
+
+import base64
+import json
+import os
+import zlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+TRAIT_INDEX_VERSION = 1
+TRAIT_INDEX_PATH = "trait_index.json"
+VNDB_DB_DIR = os.path.join("vndb", "db")
+
+
+def iter_tsv(db_dir: str, table: str, value_column: int) -> Iterator[tuple[str, str]]:
+    # (第一列, 指定列) 按行返回, 不保留整张表
+    with open(os.path.join(db_dir, table), encoding="utf-8") as file:
+        for line in file:
+            info_list = line.rstrip("\n").split("\t")
+            yield info_list[0], info_list[value_column]
+
+
+def rows_to_bitmap(rows: Iterable[int], size: int) -> int:
+    # 先在bytearray中置位再转换为整数, 避免对大整数反复做或运算
+    buffer = bytearray((size + 7) // 8)
+    for row in rows:
+        buffer[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def encode_bitmap(bitmap: int, size: int) -> str:
+    return base64.b64encode(zlib.compress(bitmap.to_bytes((size + 7) // 8, "little"))).decode("ascii")
+
+
+def decode_bitmap(text: str) -> int:
+    return int.from_bytes(zlib.decompress(base64.b64decode(text)), "little")
+
+
+def iter_bitmap_rows(bitmap: int) -> Iterator[int]:
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def descendant_closures(direct: dict[str, int], children: dict[str, list[str]]) -> dict[str, int]:
+    # 特征自身与所有子孙特征的位图之或, 按后序遍历计算, 每个特征只计算一次
+    closures: dict[str, int] = {}
+    visiting: set[str] = set()
+    for root in direct:
+        stack = [(root, False)]
+        while stack:
+            trait_id, expanded = stack.pop()
+            if trait_id in closures:
+                continue
+            if not expanded:
+                if trait_id in visiting:
+                    # 只有存在环时才会遇到, 环中的特征不再重复展开
+                    continue
+                visiting.add(trait_id)
+                stack.append((trait_id, True))
+                stack.extend((child, False) for child in children.get(trait_id, ()) if child not in closures)
+                continue
+            bitmap = direct.get(trait_id, 0)
+            for child in children.get(trait_id, ()):
+                bitmap |= closures.get(child, 0)
+            closures[trait_id] = bitmap
+    return closures
+
+
+def build_trait_index(records: Iterable[dict], path: str = TRAIT_INDEX_PATH, db_dir: str = VNDB_DB_DIR) -> int:
+    # 行号与 character.jsonl 的行对应; 同一个VNDB角色可能匹配到多个bangumi角色
+    ids = []
+    vndb_rows: dict[str, list[int]] = {}
+    for row, record in enumerate(records):
+        ids.append(record["id"])
+        if record["info"]:
+            vndb_rows.setdefault(record["info"]["id"], []).append(row)
+
+    names = dict(iter_tsv(db_dir, "traits", 7))
+    parents: dict[str, list[str]] = {}
+    children: dict[str, list[str]] = {}
+    for trait_id, parent_id in iter_tsv(db_dir, "traits_parents", 1):
+        parents.setdefault(trait_id, []).append(parent_id)
+        children.setdefault(parent_id, []).append(trait_id)
+
+    direct_rows: dict[str, list[int]] = {}
+    for char_id, trait_id in iter_tsv(db_dir, "chars_traits", 1):
+        rows = vndb_rows.get(char_id)
+        if rows:
+            direct_rows.setdefault(trait_id, []).extend(rows)
+    direct = {trait_id: rows_to_bitmap(rows, len(ids)) for trait_id, rows in direct_rows.items()}
+    closures = descendant_closures({trait_id: direct.get(trait_id, 0) for trait_id in names}, children)
+
+    traits = {}
+    for trait_id, name in names.items():
+        entry = {"name": name, "parents": parents.get(trait_id, []), "children": children.get(trait_id, [])}
+        entry["bitmap"] = encode_bitmap(closures[trait_id], len(ids))
+        # 没有子孙特征或子孙特征都没有角色时与bitmap相同, 省略
+        if direct.get(trait_id, 0) != closures[trait_id]:
+            entry["direct"] = encode_bitmap(direct.get(trait_id, 0), len(ids))
+        traits[trait_id] = entry
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"version": TRAIT_INDEX_VERSION, "ids": ids, "traits": traits}, file, ensure_ascii=False)
+    return len(traits)
+
+
+class TraitIndex:
+    # 位图以Python整数表示, 与或运算即为集合的交并; 每个位图在第一次使用时才解压
+    def __init__(self, path: str = TRAIT_INDEX_PATH) -> None:
+        with open(path, encoding="utf-8") as file:
+            index = json.load(file)
+        if index.get("version") != TRAIT_INDEX_VERSION:
+            msg = f"不支持的特征索引版本: {index.get('version')}"
+            raise ValueError(msg)
+        self.ids: list[int] = index["ids"]
+        self.traits: dict[str, dict] = index["traits"]
+        self.names: dict[str, list[str]] = {}
+        for trait_id, trait in self.traits.items():
+            self.names.setdefault(trait["name"], []).append(trait_id)
+        self._bitmaps: dict[tuple[str, bool], int] = {}
+
+    def bitmap(self, trait_id: str, descendants: bool = True) -> int:
+        key = (trait_id, descendants)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            trait = self.traits[trait_id]
+            text = trait["bitmap"] if descendants else trait.get("direct", trait["bitmap"])
+            bitmap = self._bitmaps[key] = decode_bitmap(text)
+        return bitmap
+
+    def all_of(self, *trait_ids: str, descendants: bool = True) -> int:
+        bitmap = (1 << len(self.ids)) - 1
+        for trait_id in trait_ids:
+            bitmap &= self.bitmap(trait_id, descendants)
+        return bitmap
+
+    def any_of(self, *trait_ids: str, descendants: bool = True) -> int:
+        bitmap = 0
+        for trait_id in trait_ids:
+            bitmap |= self.bitmap(trait_id, descendants)
+        return bitmap
+
+    def rows(self, bitmap: int) -> list[int]:
+        return list(iter_bitmap_rows(bitmap))
+
+    def character_ids(self, bitmap: int) -> list[int]:
+        return [self.ids[row] for row in iter_bitmap_rows(bitmap)]
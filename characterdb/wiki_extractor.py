@@ -0,0 +1,526 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+# 维基百科登场人物提取, 各语言的差异由WikiRules描述
+from __future__ import annotations
+
+import argparse
+import bz2
+import html
+import io
+import json
+import logging
+import math
+import os
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import mwparserfromhell
+import regex as re
+from lxml import etree
+from tqdm import tqdm
+
+from characterdb.checkpoint import (
+    CHECKPOINT_INTERVAL_S,
+    Checkpoint,
+    merge_counts,
+    write_json_object,
+)
+from characterdb.run_report import RunReport
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# multistream转储中每个任务最多处理的bz2流数量(每个流100个页面)
+MAX_STREAMS_PER_TASK = 50
+HEADING_LINE_RE = re.compile(r"\n(=+)")
+
+
+@dataclass(frozen=True)
+class WikiRules:
+    lang: str
+    # 标题含有这些后缀的页面整页视为登场人物列表, 后缀会从标题中去除
+    char_page_suffixes: tuple[str, ...]
+    # 信息框中作品标题字段名, 用于正则
+    title_fields: str
+    # 不视为作品标题的字段值
+    skip_titles: tuple[str, ...]
+    # 解析wikicode前执行的替换
+    pre_subs: tuple[tuple[str, str], ...] = ()
+    # 人物描述每行末尾追加的字符
+    line_end: str = ""
+    # 视为登场人物的章节名
+    section_names: tuple[str, ...] = ("登場人物",)
+    output: str = ""
+    template_output: str = "template_names.json"
+
+
+RULES = {
+    "ja": WikiRules(
+        lang="ja",
+        char_page_suffixes=("の登場人物", "の登場キャラクター一覧"),
+        title_fields="タイトル|番組名",
+        skip_titles=("関連項目",),
+        pre_subs=(
+            (r"(?:声|演)\s?-\s?\[\[.*?\]\]", ""),
+            (r"<(?:ref|REF).*?>.*?</(?:ref|REF)>", ""),
+        ),
+        line_end="\n",
+        output="jawiki.json",
+        template_output="template_names.json",
+    ),
+    "zh": WikiRules(
+        lang="zh",
+        char_page_suffixes=("角色列表",),
+        title_fields="標題",
+        skip_titles=("電視動畫",),
+        output="zhwiki.json",
+        template_output="template_names_zh.json",
+    ),
+}
+
+
+class WikiExtractor:
+    def __init__(self, rules: WikiRules, quiet: bool = False) -> None:
+        self.rules = rules
+        self.quiet = quiet
+        self.template_names: dict[str, int] = {}
+        self.title_re = re.compile(rf"\|(?:{rules.title_fields})\s*=\s*(.*)")
+        self.section_re = re.compile("|".join(re.escape(name) for name in rules.section_names))
+
+    def process_content(self, content: str) -> str:  # noqa: C901, PLR0912
+        def content_clear(content: str) -> str:
+            content = re.sub(r"<!--.*?-->", "", content)
+            content = re.sub(r"<!--\s*|\s*-->", "", content)
+            content = re.sub(r"\{\{[^}]*$", "", content)
+
+            return content.strip()
+        for pattern, repl in self.rules.pre_subs:
+            content = re.sub(pattern, repl, content)
+
+        wikicode = mwparserfromhell.parse(content)
+        # 遍历所有链接,并替换为链接文字
+        for link in wikicode.filter_wikilinks():
+            try:
+                wikicode.replace(link, link.title)
+            except Exception:
+                logging.exception("模板处理错误")
+
+        # 遍历所有模板,并替换为普通文本
+        to_replace = []
+        for template in wikicode.filter_templates():
+            # 获取模板名
+            template_plain_text = ""
+            template_name = template.name
+            if str(template_name) in self.template_names:
+                self.template_names[str(template_name)] += 1
+            else:
+                self.template_names[str(template_name)] = 1
+            # 获取模板参数
+            template_params = template.params
+            try:
+                match template_name:
+                    case "R" | "Refnest" | "refnest" | "Sfn" | "efn" | "Efn2" | "efn2" | "ISBN2" | "Anchors" | "anchors":
+                        template_plain_text = ""
+                    case "仮リンク" | "en":
+                        template_plain_text = str(template.get(1).value)
+                    case "要出典範囲":
+                        template_plain_text = str(template.get("1").value)
+                        if not template_plain_text:
+                            template_plain_text = str(template.get(1).value)
+                    case "Visible anchor" | "Vanc":
+                        template_plain_text = str(template.get(1).value)
+                    case "読み仮名" | "Ruby" | "ruby" | "読み仮名_ruby不使用" | "読み仮名 ruby不使用":
+                        if template.get(2).value:
+                            template_plain_text = f"{template.get(1).value}({template.get(2).value})"
+                        else:
+                            template_plain_text = str(template.get(1).value)
+                    case "!":
+                        template_plain_text = "|"
+                    case "補助漢字フォント" | "JIS2004フォント":
+                        if "&#" in template.get(1).value:
+                            template_plain_text = html.unescape(str(template.get(1).value))
+                        else:
+                            template_plain_text = str(template.get(1).value)
+                    case "lang" | "Lang":
+                        template_plain_text = str(template.get(2).value)
+                    case "Harvnb" | "Harvnb ":
+                        if "=" not in template_params[1]:
+                            template_plain_text = str(template.get(1).value) + str(template.get(2).value)
+                        else:
+                            template_plain_text = str(template.get(1).value)
+            except Exception:
+                logging.exception("模板处理错误")
+            else:
+                to_replace.append((template, template_plain_text))
+
+        to_replace.reverse()
+        for template, template_plain_text in to_replace:
+            for index, content in enumerate(to_replace):
+                template_, template_plain_text_ = content
+                if str(template) in template_plain_text_:
+                    to_replace[index] = (template_, template_plain_text.replace(str(template), template_plain_text_))
+                    break
+            else:
+                try:
+                    wikicode.replace(template, template_plain_text)
+                except Exception:  # noqa: PERF203
+                    logging.exception("模板处理错误")
+
+        return content_clear(wikicode.strip_code())
+
+    def process_titles(self, titles: list[str]) -> list:
+        def title_clear(title: str) -> str:
+            if title.startswith("映画"):
+                title = re.sub(r"^映画", "", title).strip()
+            title = re.sub(r"<(.*?)>.*?<\\\1>", "", title)
+            title = re.sub(r"\(.*?\)", "", title)
+            title = re.sub(r"（.*?）", "", title)
+            title = re.sub(r"【.*?】", "", title)
+            title = re.sub(r"<.*?>", "", title)
+
+            return title.strip()
+
+        result_titles = []
+        for title in titles:
+            no_chear_titles = []
+            if title.strip().startswith(("|", "(", "（", "【")):
+                continue
+            if "<br />" in title or "<br>" in title:
+                parts = []
+                parts_ = title.split("<br />")
+                for part in parts_:
+                    if "<br>" in part:
+                        parts.extend(part.split("<br>"))
+                    else:
+                        parts.append(part)
+                if not parts[0].endswith("版"):
+                    no_chear_titles.append(parts[0])
+                for part in parts[1:]:
+                    if part.strip().startswith(("|", "※", "(", "（", "【")):
+                        continue
+                    if part.strip().endswith("版"):
+                        continue
+                    if "-" in part and ":" in part:
+                        # 时间段
+                        continue
+                    no_chear_titles.append(part)
+            else:
+                no_chear_titles.append(title)
+            result_titles.extend([self.process_content(title_clear(t)) for t in no_chear_titles])
+
+        return list(dict.fromkeys(result_titles))
+
+    def extract_page(self, title: str, page_content: str) -> dict | None:
+        rules = self.rules
+        if any(suffix in title for suffix in rules.char_page_suffixes):
+            char_texts = page_content
+            for suffix in rules.char_page_suffixes:
+                title = title.replace(suffix, "")
+        else:
+            if not page_content or not any(name in page_content for name in rules.section_names):
+                return None
+
+            char_texts = find_sections(page_content, self.section_re)
+
+            if not char_texts or char_texts[0].strip().startswith(("{{Main|", "{{main|")):
+                return None
+        char_lines: dict[str, list[str]] = {}
+        char_key = None
+        for char_text in char_texts:
+            for line in char_text.split("\n"):
+                if line.startswith(";"):
+                    char_key = line.replace(";", "").strip()
+                    char_lines[char_key] = []
+                elif line.startswith(":"):
+                    if char_key:
+                        char_lines[char_key].append(line.replace(":", "").replace("*", "").strip() + rules.line_end)
+                else:
+                    char_key = None
+        if not char_lines:
+            return None
+        char_text_dict = {char_key: "".join(lines) for char_key, lines in char_lines.items()}
+        title_list = self.title_re.findall(page_content)
+        title_list.append(title)
+        title_list: list[str] = [t.strip() for t in dict.fromkeys(title_list)]
+        for index, title_ in enumerate(title_list):
+            if title_.startswith("[[") and title_.endswith("]]"):
+                title_ = title_[2:-2]
+                if "|" in title_:
+                    title_ = title_.split("|")[0]
+            title_list[index] = title_
+            if title_ in rules.skip_titles:
+                title_list.remove(title_)
+        return {"titles": title_list, "char": char_text_dict}
+
+    def iter_pages(self, source: str | io.BytesIO) -> Iterator[tuple[int, dict]]:
+        # 按页面顺序生成含有登场人物的页面 (页面id, 条目)
+        # 只订阅<page>的end事件, 此时页面已完整解析; 处理后清空该页面并从根元素中删除之前的兄弟节点, 内存占用不随页面数增长
+        context = etree.iterparse(source, events=("end",), tag="{*}page")
+        for _, page in tqdm(context, desc=self.rules.lang, disable=self.quiet):
+            page_id = page.findtext("{*}id")
+            title = page.findtext("{*}title")
+            text = page.find("{*}revision/{*}text")
+            page_content = None if text is None else text.text
+            page.clear(keep_tail=True)
+            while page.getprevious() is not None:
+                del page.getparent()[0]
+            if text is None:
+                continue
+            subject = self.extract_page(title, page_content)
+            if subject is None:
+                continue
+            yield int(page_id), subject
+
+    def extract(self, source: str | io.BytesIO) -> dict:
+        if not self.quiet:
+            logging.info(f"[{self.rules.lang}]开始提取数据")
+        subjects = {}
+        for page_id, subject in self.iter_pages(source):
+            if page_id in subjects:
+                msg = f"{page_id} 重复"
+                raise Exception(msg)  # noqa: TRY002
+            subjects[page_id] = subject
+        if not self.quiet:
+            logging.info(f"[{self.rules.lang}]提取数据完成")
+        return subjects
+
+    def extract_checkpointed(self, input_file: str, checkpoint: Checkpoint) -> int:
+        # 逐页提取并处理, 处理完的条目写入检查点. 恢复时重新解析XML, 跳过检查点中已完成的页面
+        # 标题与内容中的模板分开计数, 最后按先标题后内容合并, 与先处理全部标题再处理全部内容时的顺序相同
+        logging.info(f"[{self.rules.lang}]开始提取并处理数据")
+        skip = checkpoint.done
+        progress = checkpoint.progress
+        title_template_names: dict[str, int] = progress.get("title_template_names", {})
+        char_template_names: dict[str, int] = progress.get("char_template_names", {})
+        page_ids = {page_id for page_id, _ in checkpoint.iter_subjects()}
+        done = 0
+        for page_id, subject in self.iter_pages(input_file):
+            done += 1
+            if done <= skip:
+                if done == skip and page_id != progress["last_page_id"]:
+                    msg = f"第{done}个条目的页面id为{page_id}, 与检查点中的{progress['last_page_id']}不一致"
+                    raise ValueError(msg)
+                continue
+            if page_id in page_ids:
+                msg = f"{page_id} 重复"
+                raise Exception(msg)  # noqa: TRY002
+            page_ids.add(page_id)
+            self.template_names = title_template_names
+            subject["titles"] = self.process_titles(subject["titles"])
+            self.template_names = char_template_names
+            subject["char"] = self.process_chars(subject["char"])
+            checkpoint.add(page_id, subject)
+            checkpoint.save(done, {
+                "last_page_id": page_id,
+                "title_template_names": title_template_names,
+                "char_template_names": char_template_names,
+            })
+        self.template_names = merge_counts(title_template_names, char_template_names)
+        logging.info(f"[{self.rules.lang}]提取并处理数据完成")
+        return len(page_ids)
+
+    def extract_multistream(
+        self, input_file: str, index_file: str, workers: int | None = None, checkpoint: Checkpoint | None = None,
+    ) -> int:
+        # 按索引将转储切分为若干段bz2流, 在进程池中分别解压、提取并处理, 再按段的顺序写入检查点
+        # 恢复时沿用检查点中的分段, 只处理未完成的段
+        workers = workers or os.cpu_count() or 1
+        ranges = [tuple(r) for r in checkpoint.progress.get("ranges", [])]
+        if not ranges:
+            offsets = read_multistream_index(index_file)
+            streams_per_task = max(1, min(MAX_STREAMS_PER_TASK, math.ceil(len(offsets) / (workers * 4))))
+            ranges = stream_ranges(offsets, os.path.getsize(input_file), streams_per_task)
+            logging.info(f"[{self.rules.lang}]开始提取数据: {len(offsets)}个流, 分为{len(ranges)}段, {workers}个进程")
+        else:
+            logging.info(f"[{self.rules.lang}]继续提取数据: 剩余{len(ranges) - checkpoint.done}/{len(ranges)}段, {workers}个进程")
+
+        self.template_names = checkpoint.progress.get("template_names", {})
+        page_ids = {page_id for page_id, _ in checkpoint.iter_subjects()}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_stream_range, self.rules.lang, input_file, start, end)
+                for start, end in ranges[checkpoint.done:]
+            ]
+            for done, future in enumerate(tqdm(futures, desc=self.rules.lang), checkpoint.done + 1):
+                range_subjects, template_names = future.result()
+                for page_id, subject in range_subjects.items():
+                    if page_id in page_ids:
+                        msg = f"{page_id} 重复"
+                        raise Exception(msg)  # noqa: TRY002
+                    page_ids.add(page_id)
+                    checkpoint.add(page_id, subject)
+                for name, count in template_names.items():
+                    self.template_names[name] = self.template_names.get(name, 0) + count
+                checkpoint.save(done, {"ranges": ranges, "template_names": self.template_names})
+        logging.info(f"[{self.rules.lang}]提取数据完成")
+        return len(page_ids)
+
+    def process_all_titles(self, subjects: dict) -> None:
+        for subject in tqdm(subjects.values(), total=len(subjects), desc=self.rules.lang, disable=self.quiet):
+            subject["titles"] = self.process_titles(subject["titles"])
+
+    def process_chars(self, chars: dict[str, str]) -> dict[str, str]:
+        new_char_dict = {}
+        for char_key, char_text in chars.items():
+            new_char_dict[self.process_content(char_key)] = self.process_content(char_text)
+        return new_char_dict
+
+    def process_all_chars(self, subjects: dict) -> None:
+        for subject in tqdm(subjects.values(), total=len(subjects), desc=self.rules.lang, disable=self.quiet):
+            subject["char"] = self.process_chars(subject["char"])
+
+    def run(  # noqa: PLR0913
+        self, input_file: str, index_file: str | None = None, workers: int | None = None, profile_dir: str | None = None,
+        resume: bool = False, checkpoint_interval: float = CHECKPOINT_INTERVAL_S,
+    ) -> dict:
+        run_report = RunReport(f"{self.rules.lang}_wiki", profile_dir=profile_dir)
+        # 处理完的条目保存在检查点目录中, 全部完成后再从中写出结果, 成功后删除
+        source = {
+            "input": os.path.basename(input_file),
+            "size": os.path.getsize(input_file),
+            "index": os.path.basename(index_file) if index_file else None,
+        }
+        checkpoint = Checkpoint(f"{self.rules.output}.checkpoint", source, checkpoint_interval, resume)
+        if index_file:
+            # 标题与内容的处理也在各进程中完成
+            with run_report.stage("extract_multistream") as stage:
+                subjects_count = self.extract_multistream(input_file, index_file, workers, checkpoint)
+                stage.items_out = subjects_count
+        else:
+            with run_report.stage("extract") as stage:
+                subjects_count = self.extract_checkpointed(input_file, checkpoint)
+                stage.items_out = subjects_count
+
+        with run_report.stage("serialize", subjects_count):
+            with open(self.rules.template_output, "w", encoding="utf-8") as f:
+                json.dump(self.template_names, f, ensure_ascii=False, indent=4)
+
+            write_json_object(self.rules.output, checkpoint.iter_subjects())
+        checkpoint.remove()
+
+        run_report.save()
+        return {"lang": self.rules.lang, "subjects": subjects_count, "output": self.rules.output}
+
+
+def index_headings(text: str) -> dict[int, list[int]]:
+    # 一次扫描记录所有以"="开头的行: 等号个数 -> 该行之前换行符的位置(升序)
+    headings: dict[int, list[int]] = {}
+    for match in HEADING_LINE_RE.finditer(text):
+        headings.setdefault(len(match.group(1)), []).append(match.start())
+    return headings
+
+
+def find_sections(text: str, name_re: re.Pattern) -> list[str]:  # noqa: C901
+    # 与 re.findall(r"(=+)\s*登場人物\s*\1((?:\n.*?)*?)\n\1[^=]", text) 的结果相同, 但耗时与页面长度成线性:
+    # 标题两侧等号数相同且结尾紧接换行, 章节到下一个恰好以同样数量等号开头的行为止, 找不到则不算匹配
+    sections = []
+    headings = None
+    floor = 0  # 上一个匹配的结尾, 之后的匹配不能与其重叠
+    search_from = 0
+    while match := name_re.search(text, search_from):
+        start, end = match.span()
+        search_from = end
+        i = start
+        while i > floor and text[i - 1].isspace():
+            i -= 1
+        j = i
+        while j > floor and text[j - 1] == "=":
+            j -= 1
+        k = end
+        while k < len(text) and text[k].isspace():
+            k += 1
+        body_start = k
+        while body_start < len(text) and text[body_start] == "=":
+            body_start += 1
+        level = body_start - k
+        if not 0 < level <= i - j or not text.startswith("\n", body_start):
+            continue
+
+        if headings is None:
+            headings = index_headings(text)
+        lines = headings.get(level, [])
+        n = bisect_left(lines, body_start)
+        if n == len(lines) or lines[n] + level + 1 >= len(text):
+            continue
+        sections.append(text[body_start:lines[n]])
+        floor = search_from = lines[n] + level + 2
+    return sections
+
+
+def read_multistream_index(index_file: str) -> list[int]:
+    # 索引每行为 offset:page_id:title, 同一个流的页面共用一个offset
+    offsets = []
+    with (bz2.open if index_file.endswith(".bz2") else open)(index_file, "rt", encoding="utf-8") as f:
+        for line in f:
+            offset = int(line.split(":", 1)[0])
+            if not offsets or offset != offsets[-1]:
+                offsets.append(offset)
+    return offsets
+
+
+def stream_ranges(offsets: list[int], file_size: int, streams_per_task: int) -> list[tuple[int, int]]:
+    # 第一个offset之前是只含siteinfo的流, 直接跳过; 最后一段包含结尾的</mediawiki>流
+    starts = offsets[::streams_per_task]
+    return list(zip(starts, [*starts[1:], file_size], strict=True))
+
+
+def process_stream_range(lang: str, input_file: str, start: int, end: int) -> tuple[dict, dict]:
+    with open(input_file, "rb") as f:
+        f.seek(start)
+        data = bz2.decompress(f.read(end - start))
+    # 各流只含<page>片段, 补上根元素后交给同一套解析流程
+    data = b"<mediawiki>" + data.replace(b"</mediawiki>", b"") + b"</mediawiki>"
+    extractor = WikiExtractor(RULES[lang], quiet=True)
+    subjects = extractor.extract(io.BytesIO(data))
+    extractor.process_all_titles(subjects)
+    extractor.process_all_chars(subjects)
+    return subjects, extractor.template_names
+
+
+def run_language(  # noqa: PLR0913
+    lang: str, input_file: str, index_file: str | None = None, workers: int | None = None, profile_dir: str | None = None,
+    resume: bool = False, checkpoint_interval: float = CHECKPOINT_INTERVAL_S,
+) -> dict:
+    return WikiExtractor(RULES[lang]).run(input_file, index_file, workers, profile_dir, resume, checkpoint_interval)
+
+
+def run_all(  # noqa: PLR0913
+    inputs: dict[str, str], indexes: dict[str, str], workers: int | None = None, profile_dir: str | None = None,
+    resume: bool = False, checkpoint_interval: float = CHECKPOINT_INTERVAL_S,
+) -> list[dict]:
+    # 各语言的转储相互独立, 各用一个进程同时处理
+    if len(inputs) == 1:
+        lang, input_file = next(iter(inputs.items()))
+        return [run_language(lang, input_file, indexes.get(lang), workers, profile_dir, resume, checkpoint_interval)]
+    with ProcessPoolExecutor(max_workers=len(inputs)) as executor:
+        futures = [
+            executor.submit(
+                run_language, lang, input_file, indexes.get(lang), workers, profile_dir, resume, checkpoint_interval,
+            )
+            for lang, input_file in inputs.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s]%(asctime)s(%(lineno)d):%(message)s")
+    parser = argparse.ArgumentParser()
+    for lang in RULES:
+        parser.add_argument(f"--{lang}", type=str, default=None, help=f"{lang}wiki pages-articles XML 或 multistream bz2 路径")
+        parser.add_argument(f"--{lang}-index", type=str, default=None, help="multistream 转储的索引文件")
+    parser.add_argument("--workers", type=int, default=None, help="处理multistream转储的进程数, 默认为CPU核数")
+    parser.add_argument("--profile", type=str, nargs="?", const="profile", default=None, metavar="DIR",
+                        help="用cProfile记录每个阶段, 并输出到该目录(默认profile)")
+    parser.add_argument("--resume", action="store_true", help="从上次中断时保存的检查点继续")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL_S, metavar="SECONDS",
+                        help="两次保存检查点的最短间隔秒数")
+    args = parser.parse_args(argv)
+    inputs = {lang: getattr(args, lang) for lang in RULES if getattr(args, lang)}
+    indexes = {lang: getattr(args, f"{lang}_index") for lang in RULES if getattr(args, f"{lang}_index")}
+    if not inputs:
+        parser.error("至少需要指定一个语言的输入文件")
+
+    for result in run_all(inputs, indexes, args.workers, args.profile, args.resume, args.checkpoint_interval):
+        logging.info(f"[{result['lang']}]{result['subjects']}个条目已保存到{result['output']}")
@@ -0,0 +1,8 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright (c) 2024 沉默の金
+from __future__ import annotations
+
+from characterdb.wiki_extractor import main
+
+if __name__ == "__main__":
+    main()